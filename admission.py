@@ -0,0 +1,200 @@
+"""Контроль допуска запросов: лимиты параллельности по классам маршрутов и сброс нагрузки.
+
+Запрос относится к классу по префиксу пути (ADMISSION_ROUTES), а если префикс не
+найден — по методу: GET/HEAD/OPTIONS — read, остальные — write. У каждого класса
+свой лимит одновременно выполняемых запросов и своя очередь; классы, держащие
+соединение с БД (auth, read, write, export), дополнительно делят общий лимит
+ADMISSION_TOTAL_LIMIT. Освободившееся место получает ожидающий запрос самого
+приоритетного класса: health > auth > read > write > export > stream.
+
+Запрос, которому не хватило места в очереди или который не дождался допуска за
+ADMISSION_MAX_WAIT_MS, сразу получает 503 с Retry-After: время ответа остается
+ограниченным, а не растет до таймаута клиента. health не ограничивается вовсе.
+Лимиты действуют в пределах процесса (воркера); общий лимит не должен превышать
+пул соединений с БД, иначе допущенные запросы ждут соединение и падают с 500.
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import time
+
+from config import settings
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {'health': 0, 'auth': 1, 'read': 2, 'write': 3, 'export': 4, 'stream': 5}
+SHARED_CLASSES = ('auth', 'read', 'write', 'export')
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+admission_in_flight = registry.gauge(
+    'admission_in_flight', 'Выполняемые запросы по классу маршрутов', ('route_class',))
+admission_queue_depth = registry.gauge(
+    'admission_queue_depth', 'Запросы, ожидающие допуска', ('route_class',))
+admission_shed_total = registry.counter(
+    'admission_shed_total', 'Запросы, отклоненные с 503', ('route_class', 'reason'))
+admission_wait_seconds = registry.histogram(
+    'admission_wait_seconds', 'Ожидание допуска в очереди', ('route_class',))
+
+
+class Overloaded(Exception):
+    """Запрос не допущен: reason — queue_full или timeout"""
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Счетчики мест и приоритетная очередь ожидающих; работает в одном event loop"""
+
+    def __init__(self, limits, queue_sizes, total_limit, max_wait):
+        unknown = set(limits) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Неизвестные классы маршрутов: {', '.join(sorted(unknown))}")
+        self.limits = limits            # класс -> лимит (0 или нет ключа — без лимита)
+        self.queue_sizes = queue_sizes  # класс -> длина очереди (нет ключа — без очереди)
+        self.total_limit = total_limit
+        self.max_wait = max_wait
+        self.in_flight = dict.fromkeys(PRIORITIES, 0)
+        self.queued = dict.fromkeys(PRIORITIES, 0)
+        self.shared_in_flight = 0
+        self._waiters = []  # куча (приоритет, номер, класс, future)
+        self._sequence = itertools.count()
+
+    def _has_room(self, route_class):
+        limit = self.limits.get(route_class, 0)
+        if limit and self.in_flight[route_class] >= limit:
+            return False
+        if route_class in SHARED_CLASSES and self.total_limit and self.shared_in_flight >= self.total_limit:
+            return False
+        return True
+
+    def _take(self, route_class):
+        self.in_flight[route_class] += 1
+        if route_class in SHARED_CLASSES:
+            self.shared_in_flight += 1
+        admission_in_flight.inc(route_class=route_class)
+
+    def _dequeued(self, route_class):
+        self.queued[route_class] -= 1
+        admission_queue_depth.dec(route_class=route_class)
+
+    async def acquire(self, route_class):
+        # Без очереди своего класса и при свободном месте — сразу; иначе в очередь (FIFO внутри класса)
+        if not self.queued[route_class] and self._has_room(route_class):
+            self._take(route_class)
+            return
+        if self.queued[route_class] >= self.queue_sizes.get(route_class, 0):
+            raise Overloaded('queue_full')
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITIES[route_class], next(self._sequence), route_class, future))
+        self.queued[route_class] += 1
+        admission_queue_depth.inc(route_class=route_class)
+
+        started = time.perf_counter()
+        granted = False
+        try:
+            await asyncio.wait((future,), timeout=self.max_wait)
+            granted = future.done()
+        finally:
+            if not future.done():
+                future.cancel()  # запись останется в куче и будет пропущена в _wake
+                self._dequeued(route_class)
+            elif not granted:
+                self.release(route_class)  # место выдано, но ожидание прервано (клиент отключился)
+            admission_wait_seconds.observe(time.perf_counter() - started, route_class=route_class)
+        if not granted:
+            raise Overloaded('timeout')
+
+    def release(self, route_class):
+        self.in_flight[route_class] -= 1
+        if route_class in SHARED_CLASSES:
+            self.shared_in_flight -= 1
+        admission_in_flight.dec(route_class=route_class)
+        self._wake()
+
+    def _wake(self):
+        """Выдать освободившиеся места ожидающим в порядке приоритета"""
+        blocked = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            _, _, route_class, future = entry
+            if future.done():
+                continue
+            if self._has_room(route_class):
+                self._take(route_class)
+                self._dequeued(route_class)
+                future.set_result(None)
+            else:
+                blocked.append(entry)
+        for entry in blocked:
+            heapq.heappush(self._waiters, entry)
+
+
+class AdmissionMiddleware:
+    """ASGI-middleware: допуск запросов по классам маршрутов, 503 + Retry-After при перегрузке"""
+
+    def __init__(self, app):
+        self.app = app
+        unknown = set(settings.ADMISSION_ROUTES.values()) - set(PRIORITIES)
+        if unknown:
+            raise ValueError(f"Неизвестные классы маршрутов: {', '.join(sorted(unknown))}")
+        # Самый длинный префикс проверяется первым
+        self.routes = sorted(settings.ADMISSION_ROUTES.items(), key=lambda item: len(item[0]), reverse=True)
+        self.controller = AdmissionController(
+            settings.ADMISSION_LIMITS,
+            settings.ADMISSION_QUEUE_SIZES,
+            settings.ADMISSION_TOTAL_LIMIT,
+            settings.ADMISSION_MAX_WAIT_MS / 1000
+        )
+        pool_capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+        if not settings.ADMISSION_TOTAL_LIMIT or settings.ADMISSION_TOTAL_LIMIT >= pool_capacity:
+            logger.warning("ADMISSION_TOTAL_LIMIT=%s не меньше пула соединений с БД (%s): "
+                           "при нагрузке запросы будут ждать соединение вместо 503",
+                           settings.ADMISSION_TOTAL_LIMIT, pool_capacity)
+        self.rejection = json.dumps({"detail": "Сервер перегружен, повторите запрос позже"},
+                                    ensure_ascii=False).encode()
+
+    def route_class(self, method, path):
+        for prefix, route_class in self.routes:
+            if path.startswith(prefix):
+                return route_class
+        return 'read' if method in READ_METHODS else 'write'
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.route_class(scope['method'], scope['path'])
+        if route_class == 'health':
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(route_class)
+        except Overloaded as e:
+            admission_shed_total.inc(route_class=route_class, reason=e.reason)
+            await self._reject(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route_class)
+
+    async def _reject(self, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(self.rejection)).encode()),
+                (b'retry-after', str(settings.ADMISSION_RETRY_AFTER).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': self.rejection})
@@ -0,0 +1,166 @@
+"""Аналитика жалоб на сводной таблице complaint_daily_stats.
+
+Сводка обновляется инкрементально при добавлении жалоб (record_complaints) и
+может быть полностью пересобрана из таблицы complaints (rebuild_complaint_stats).
+Запросы дашбордов читают только сводку, не сканируя жалобы.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import select, delete, func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import Complaint, ComplaintDailyStat, Symptom, SymptomCategory
+import writer
+
+GROUP_BY_OPTIONS = ('symptom', 'category', 'severity')
+GRANULARITY_OPTIONS = ('day', 'week')
+REBUILD_CHUNK_SIZE = 500000
+
+
+def _symptom_categories(session):
+    return dict(session.execute(select(Symptom.id, Symptom.category_id)).all())
+
+
+def _as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _upsert_counts(session, counts, categories):
+    """Прибавить счетчики {(day, symptom_id, severity): n} к сводке одним executemany"""
+    rows = [
+        {"day": day, "symptom_id": symptom_id, "severity": severity,
+         "category_id": categories[symptom_id], "count": n}
+        for (day, symptom_id, severity), n in counts.items()
+        if symptom_id in categories
+    ]
+    if not rows:
+        return 0
+    statement = sqlite_insert(ComplaintDailyStat)
+    statement = statement.on_conflict_do_update(
+        index_elements=['day', 'symptom_id', 'severity'],
+        set_={"count": ComplaintDailyStat.count + statement.excluded.count}
+    )
+    session.execute(statement, rows)
+    return len(rows)
+
+
+# ========== ОБНОВЛЕНИЕ СВОДКИ ==========
+
+def record_complaints(session, complaints, categories=None):
+    """Учесть новые жалобы в сводке (в текущей транзакции, без commit).
+
+    complaints — объекты Complaint или кортежи (symptom_id, complaint_date, severity).
+    """
+    counts = Counter()
+    for c in complaints:
+        if isinstance(c, Complaint):
+            c = (c.symptom_id, c.complaint_date, c.severity)
+        symptom_id, complaint_date, severity = c
+        counts[(_as_day(complaint_date), symptom_id, severity)] += 1
+    if not counts:
+        return 0
+    return _upsert_counts(session, counts, categories or _symptom_categories(session))
+
+
+def rebuild_complaint_stats(session, chunk_size=REBUILD_CHUNK_SIZE):
+    """Полностью пересобрать сводку из таблицы complaints (pandas, по частям)"""
+    query = select(Complaint.complaint_date, Complaint.symptom_id, Complaint.severity)
+    parts = []
+    for chunk in pd.read_sql(query, session.connection(), chunksize=chunk_size):
+        if chunk.empty:
+            continue
+        chunk['day'] = pd.to_datetime(chunk['complaint_date']).dt.normalize()
+        parts.append(chunk.groupby(['day', 'symptom_id', 'severity'], sort=False).size())
+
+    if not parts:
+        return writer.execute(_replace_stats, [])
+
+    totals = pd.concat(parts).groupby(level=[0, 1, 2]).sum().rename('count').reset_index()
+    categories = _symptom_categories(session)
+    totals['category_id'] = totals['symptom_id'].map(categories)
+    totals = totals.dropna(subset=['category_id'])
+    totals['day'] = totals['day'].dt.date
+    totals = totals.astype({'symptom_id': 'int64', 'category_id': 'int64', 'count': 'int64'})
+
+    rows = totals[['day', 'symptom_id', 'severity', 'category_id', 'count']].to_dict('records')
+    session.commit()  # завершить читающую транзакцию, запись идет через писателя
+    return writer.execute(_replace_stats, rows)
+
+
+def _replace_stats(session, rows):
+    session.execute(delete(ComplaintDailyStat))
+    if rows:
+        session.execute(insert(ComplaintDailyStat), rows)
+    return len(rows)
+
+
+# ========== ЗАПРОСЫ ==========
+
+def _period_column(granularity):
+    if granularity == 'week':
+        # Понедельник недели, к которой относится день
+        return func.date(ComplaintDailyStat.day, 'weekday 0', '-6 days')
+    return ComplaintDailyStat.day
+
+
+def complaint_counts(session, date_from, date_to, group_by='symptom', granularity='day'):
+    """Количество жалоб по периодам (день/неделя) в разрезе симптома, категории или тяжести"""
+    period = _period_column(granularity).label('period')
+    total = func.sum(ComplaintDailyStat.count).label('count')
+
+    if group_by == 'category':
+        key = ComplaintDailyStat.category_id
+        query = (select(period, key, SymptomCategory.name, total)
+                 .join(SymptomCategory, SymptomCategory.id == key))
+    elif group_by == 'severity':
+        key = ComplaintDailyStat.severity
+        query = select(period, key, key, total)
+    else:
+        key = ComplaintDailyStat.symptom_id
+        query = select(period, key, Symptom.name, total).join(Symptom, Symptom.id == key)
+
+    query = (query
+             .where(ComplaintDailyStat.day >= date_from, ComplaintDailyStat.day <= date_to)
+             .group_by(period, key)
+             .order_by(period, key))
+
+    return [
+        {"period": str(row[0]), "key": row[1], "name": row[2], "count": row[3]}
+        for row in session.execute(query)
+    ]
+
+
+def rising_symptoms(session, days=7, limit=10, today=None):
+    """Симптомы с наибольшим ростом числа жалоб: последние days дней против предыдущих days"""
+    today = today or date.today()
+    current_from = today - timedelta(days=days - 1)
+    previous_from = current_from - timedelta(days=days)
+
+    current = func.sum(ComplaintDailyStat.count).filter(ComplaintDailyStat.day >= current_from)
+    previous = func.sum(ComplaintDailyStat.count).filter(ComplaintDailyStat.day < current_from)
+    query = (
+        select(ComplaintDailyStat.symptom_id, Symptom.name,
+               func.coalesce(current, 0).label('current'),
+               func.coalesce(previous, 0).label('previous'))
+        .join(Symptom, Symptom.id == ComplaintDailyStat.symptom_id)
+        .where(ComplaintDailyStat.day >= previous_from, ComplaintDailyStat.day <= today)
+        .group_by(ComplaintDailyStat.symptom_id)
+    )
+
+    result = []
+    for symptom_id, name, current_count, previous_count in session.execute(query):
+        growth = current_count - previous_count
+        if growth <= 0:
+            continue
+        result.append({
+            "symptom_id": symptom_id,
+            "symptom_name": name,
+            "current": current_count,
+            "previous": previous_count,
+            "growth": growth,
+            "growth_ratio": round(current_count / previous_count, 2) if previous_count else None
+        })
+    result.sort(key=lambda r: (r["growth"], r["current"]), reverse=True)
+    return result[:limit]
@@ -0,0 +1,169 @@
+"""Журнал доступа к медицинским данным: кто, когда и к какому пациенту обращался.
+
+record() только кладет запись в кольцевой буфер в памяти и не обращается к БД,
+поэтому не замедляет обработчики. Фоновый поток сбрасывает буфер пачками
+(AUDIT_FLUSH_SIZE записей или раз в AUDIT_FLUSH_INTERVAL_MS) в отдельную базу
+SQLite (AUDIT_DB_PATH): запись журнала не конкурирует с писателем основной БД.
+Журнал только дополняется; индексы по пациенту и по пользователю позволяют
+быстро отвечать на запросы проверяющих.
+
+Потери ограничены: при переполнении буфера вытесняются самые старые
+несброшенные записи, а при ошибке записи теряется одна пачка; то и другое
+учитывается в метриках audit_events_dropped_total{reason}.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, Index, create_engine, insert, select
+)
+
+from config import settings
+from database import apply_sqlite_pragmas
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+audit_events = Table(
+    "audit_events", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("at", DateTime, nullable=False),
+    Column("user_id", Integer, nullable=False),
+    Column("role", String(20), nullable=False),
+    Column("action", String(50), nullable=False),
+    Column("patient_id", Integer, nullable=True),
+    Column("detail", String(200), nullable=True),
+    Index("ix_audit_events_patient_at", "patient_id", "at"),
+    Index("ix_audit_events_user_at", "user_id", "at"),
+)
+
+audit_events_total = registry.counter('audit_events_total', 'Записи журнала доступа', ('action',))
+audit_events_dropped_total = registry.counter(
+    'audit_events_dropped_total', 'Потерянные записи журнала доступа', ('reason',))
+audit_buffer_size = registry.gauge('audit_buffer_size', 'Записи журнала в буфере, ожидающие сброса')
+audit_flush_size = registry.histogram(
+    'audit_flush_size', 'Записей журнала в одном сбросе',
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000))
+audit_flush_duration_seconds = registry.histogram(
+    'audit_flush_duration_seconds', 'Время сброса пачки журнала')
+
+
+def create_audit_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(engine)
+    return engine
+
+
+class AuditLog:
+    def __init__(self, path=None, buffer_size=None, flush_size=None, flush_interval=None):
+        self.path = path or settings.AUDIT_DB_PATH
+        self.flush_size = flush_size or settings.AUDIT_FLUSH_SIZE
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else settings.AUDIT_FLUSH_INTERVAL_MS / 1000)
+        self._buffer = deque(maxlen=buffer_size or settings.AUDIT_BUFFER_SIZE)
+        self._engine = None
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_audit_engine(self.path)
+            metadata.create_all(self._engine)
+        return self._engine
+
+    # ========== ЗАПИСЬ ==========
+
+    def record(self, user, action, patient_id=None, detail=None):
+        """Добавить запись о доступе (не блокирует: только буфер в памяти)"""
+        if len(self._buffer) == self._buffer.maxlen:
+            audit_events_dropped_total.inc(reason='overflow')
+        self._buffer.append({
+            "at": datetime.utcnow(),
+            "user_id": user.id,
+            "role": user.role,
+            "action": action,
+            "patient_id": patient_id,
+            "detail": detail,
+        })
+        audit_events_total.inc(action=action)
+        audit_buffer_size.set(len(self._buffer))
+        if len(self._buffer) >= self.flush_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.engine  # создать базу и таблицу до первого сброса
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name='audit-flush', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Сбросить оставшиеся записи и остановить поток"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while self._buffer:
+                self.flush()
+            if self._stopping:
+                return
+
+    def flush(self):
+        """Записать в журнал до flush_size записей из буфера одной транзакцией"""
+        batch = []
+        while self._buffer and len(batch) < self.flush_size:
+            batch.append(self._buffer.popleft())
+        audit_buffer_size.set(len(self._buffer))
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(audit_events), batch)
+        except Exception as e:
+            logger.error("Не удалось записать журнал доступа (%d записей)", len(batch), exc_info=e)
+            audit_events_dropped_total.inc(len(batch), reason='flush_error')
+            return 0
+        audit_flush_size.observe(len(batch))
+        audit_flush_duration_seconds.observe(time.perf_counter() - started)
+        return len(batch)
+
+    # ========== ЗАПРОСЫ ==========
+
+    def query(self, patient_id=None, user_id=None, since=None, until=None, limit=100):
+        """Записи по пациенту и/или пользователю, новые первыми (по индексам *_at)"""
+        query = select(audit_events).order_by(audit_events.c.at.desc()).limit(limit)
+        if patient_id is not None:
+            query = query.where(audit_events.c.patient_id == patient_id)
+        if user_id is not None:
+            query = query.where(audit_events.c.user_id == user_id)
+        if since is not None:
+            query = query.where(audit_events.c.at >= since)
+        if until is not None:
+            query = query.where(audit_events.c.at < until)
+        with self.engine.connect() as connection:
+            return [dict(row._mapping) for row in connection.execute(query)]
+
+
+log = AuditLog()
+
+
+def record(user, action, patient_id=None, detail=None):
+    if settings.AUDIT_ENABLED:
+        log.record(user, action, patient_id, detail)
@@ -0,0 +1,210 @@
+"""Прием жалоб пациентов: проверка по справочнику в памяти и отложенная запись пачками.
+
+Жалоба проверяется по справочнику симптомов в памяти (без запроса к БД) и
+кладется в ограниченный буфер процесса. Буфер сбрасывается одной транзакцией
+через писателя БД, когда набирается COMPLAINT_FLUSH_SIZE жалоб или проходит
+COMPLAINT_FLUSH_INTERVAL_MS с момента поступления первой из них. Сводка
+аналитики обновляется и события подписчикам записываются один раз на сброс.
+
+Подтверждение записи (ack):
+    buffered  — жалоба принята в буфер; при аварийной остановке процесса
+                несброшенные жалобы теряются (не больше одного буфера);
+    committed — ответ после фиксации транзакции с жалобой, с ее id.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import select, insert
+from starlette.concurrency import run_in_threadpool
+
+from analytics import record_complaints
+from config import settings
+from database import SessionLocal
+from metrics import registry
+from models import Complaint, Symptom
+from twin import SEVERITY_SCORES
+from utils import naive_utc
+import events
+import writer
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = tuple(SEVERITY_SCORES)
+ACK_OPTIONS = ('buffered', 'committed')
+SYMPTOMS_RELOAD_SECONDS = 60
+
+complaint_buffer_size = registry.gauge(
+    'complaint_buffer_size', 'Жалобы в буфере, ожидающие записи')
+complaint_flush_size = registry.histogram(
+    'complaint_flush_size', 'Жалоб в одной групповой записи',
+    buckets=(1, 5, 10, 50, 100, 500, 1000, 5000))
+complaint_flush_duration_seconds = registry.histogram(
+    'complaint_flush_duration_seconds', 'Время групповой записи жалоб')
+complaints_rejected_total = registry.counter(
+    'complaints_rejected_total', 'Жалобы, не принятые в переполненный буфер')
+complaints_lost_total = registry.counter(
+    'complaints_lost_total', 'Принятые жалобы, которые не удалось записать')
+
+
+class ComplaintIn(BaseModel):
+    symptom_id: int
+    severity: str
+    complaint_date: Optional[datetime] = None
+    description: Optional[str] = Field(default=None, max_length=2000)
+
+
+class BufferFull(Exception):
+    pass
+
+
+# ========== СПРАВОЧНИК СИМПТОМОВ ==========
+
+class SymptomCatalog:
+    """Симптомы в памяти: id -> category_id (перечитываются при промахе, не чаще раза в минуту)"""
+
+    def __init__(self):
+        self.categories = {}
+        self.loaded_at = None
+
+    def load(self):
+        with SessionLocal() as session:
+            self.categories = dict(session.execute(select(Symptom.id, Symptom.category_id)).all())
+        self.loaded_at = time.monotonic()
+
+    async def contains(self, symptom_id):
+        if symptom_id in self.categories:
+            return True
+        if self.loaded_at is None or time.monotonic() - self.loaded_at > SYMPTOMS_RELOAD_SECONDS:
+            await run_in_threadpool(self.load)
+        return symptom_id in self.categories
+
+
+catalog = SymptomCatalog()
+
+
+async def validate(complaint: ComplaintIn):
+    """Проверить симптом и тяжесть по справочнику; 422 при ошибке"""
+    if complaint.severity not in SEVERITIES:
+        raise HTTPException(status_code=422, detail=f"severity: одно из {', '.join(SEVERITIES)}")
+    if not await catalog.contains(complaint.symptom_id):
+        raise HTTPException(status_code=422, detail=f"Неизвестный симптом: {complaint.symptom_id}")
+
+
+# ========== ЗАПИСЬ ==========
+
+def _insert_complaints(session, rows, categories):
+    """Задание писателя: вставка пачки жалоб и обновление сводки в одной транзакции"""
+    ids = list(session.scalars(insert(Complaint).returning(Complaint.id, sort_by_parameter_order=True), rows))
+    record_complaints(session, [(r["symptom_id"], r["complaint_date"], r["severity"]) for r in rows], categories)
+    events.record_ids(session, 'complaint', zip((r["patient_id"] for r in rows), ids))
+    return ids
+
+
+class ComplaintBuffer:
+    """Ограниченный буфер жалоб с групповой записью по размеру или по времени"""
+
+    def __init__(self, max_size=None, flush_size=None, flush_interval=None):
+        self.max_size = max_size or settings.COMPLAINT_BUFFER_SIZE
+        self.flush_size = flush_size or settings.COMPLAINT_FLUSH_SIZE
+        self.flush_interval = (flush_interval if flush_interval is not None
+                               else settings.COMPLAINT_FLUSH_INTERVAL_MS / 1000)
+        self._pending = []  # (строка, future для ack=committed или None, время поступления)
+        self._wakeup = None
+        self._task = None
+        self._stopping = False
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Сбросить оставшиеся жалобы и остановить фоновую запись"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def add(self, row, wait=False):
+        """Положить жалобу в буфер; при wait=True вернуть future с id после фиксации"""
+        if self._task is None or len(self._pending) >= self.max_size:
+            complaints_rejected_total.inc()
+            raise BufferFull()
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._pending.append((row, future, time.monotonic()))
+        complaint_buffer_size.set(len(self._pending))
+        if len(self._pending) == 1 or len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+        return future
+
+    def _due(self):
+        """Пора ли сбрасывать: набран размер пачки, вышло время первой жалобы или идет остановка"""
+        return bool(self._pending) and (
+            self._stopping or len(self._pending) >= self.flush_size
+            or time.monotonic() >= self._pending[0][2] + self.flush_interval)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if self._due():
+                await self._flush()
+                continue
+            if self._stopping:
+                return
+            timeout = None
+            if self._pending:
+                timeout = self._pending[0][2] + self.flush_interval - time.monotonic()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _flush(self):
+        batch = self._pending[:self.flush_size]
+        self._pending = self._pending[self.flush_size:]
+        complaint_buffer_size.set(len(self._pending))
+
+        rows = [row for row, _, _ in batch]
+        started = time.perf_counter()
+        try:
+            ids = await writer.run(_insert_complaints, rows, catalog.categories)
+        except Exception as e:
+            logger.error("Не удалось записать пачку жалоб (%d)", len(rows), exc_info=e)
+            complaints_lost_total.inc(sum(1 for _, future, _ in batch if future is None))
+            for _, future, _ in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+        complaint_flush_duration_seconds.observe(time.perf_counter() - started)
+        complaint_flush_size.observe(len(rows))
+
+        for (_, future, _), complaint_id in zip(batch, ids):
+            if future is not None and not future.done():
+                future.set_result(complaint_id)
+
+
+buffer = ComplaintBuffer()
+
+
+async def submit(patient_id, complaint: ComplaintIn, ack='buffered'):
+    """Принять жалобу пациента; для ack=committed вернуть id после записи, иначе None"""
+    await validate(complaint)
+    complaint_date = naive_utc(complaint.complaint_date) or datetime.utcnow()
+    row = {
+        "patient_id": patient_id,
+        "symptom_id": complaint.symptom_id,
+        "severity": complaint.severity,
+        "complaint_date": complaint_date,
+        "description": complaint.description,
+    }
+    future = buffer.add(row, wait=ack == 'committed')
+    if future is None:
+        return None
+    return await asyncio.shield(future)
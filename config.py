@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 
 class Settings(BaseSettings):
@@ -10,10 +10,92 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     CORS_ORIGINS: List[str] = ["http://localhost:8080", "http://127.0.0.1:8080"]
+    METRICS_ENABLED: bool = True
+    # Несколько воркеров: метрики суммируются через файлы в METRICS_DIR (включается --prod)
+    METRICS_MULTIPROCESS: bool = False
+    METRICS_DIR: str = "metrics_mp"
+    METRICS_SYNC_SECONDS: float = 1.0
+
+    # Профилирование запросов: по заголовку X-Profile / параметру _profile с этим токеном
+    # или для случайной доли запросов
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: float = 1.0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_KEEP: int = 200
+
+    # Фоновые задачи (интервал в секундах, 0 — отключить)
+    SCHEDULER_ENABLED: bool = True
+    EXPIRE_PRESCRIPTIONS_INTERVAL: int = 3600
+    EXPIRE_BATCH_SIZE: int = 1000
+    TWIN_REFRESH_INTERVAL: int = 300
+    TWIN_BATCH_SIZE: int = 5000
+
+    # Запись в SQLite: один писатель на процесс, межпроцессная блокировка, пачки
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # Пул соединений процесса: запросы держат соединение до конца ответа, плюс писатель,
+    # опрос событий SSE и фоновые задачи; ожидание свободного соединения — не дольше DB_POOL_TIMEOUT
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 5.0
+    WRITE_LOCK_PATH: str = "medical.db.write.lock"
+    WRITE_BATCH_SIZE: int = 100
+    WRITE_BATCH_DELAY_MS: float = 2.0
+    SCHEDULER_LOCK_PATH: str = "medical.db.scheduler.lock"
+
+    # Server-sent events для врачей: события пишутся в patient_events, каждый воркер их опрашивает
+    SSE_BUFFER_SIZE: int = 100
+    SSE_HEARTBEAT_SECONDS: float = 15.0
+    SSE_RETRY_MS: int = 3000
+    SSE_MAX_PATIENTS: int = 1000
+    SSE_POLL_INTERVAL_MS: float = 250.0
+    SSE_POLL_BATCH: int = 1000
+    SSE_EVENT_RETENTION_MINUTES: int = 60
+    SSE_EVENTS_PURGE_INTERVAL: int = 600
+
+    # Прием жалоб: буфер процесса и групповая запись по размеру или по времени
+    COMPLAINT_BUFFER_SIZE: int = 10000
+    COMPLAINT_FLUSH_SIZE: int = 500
+    COMPLAINT_FLUSH_INTERVAL_MS: float = 50.0
+
+    # Создание назначений: не больше строк за один запрос
+    PRESCRIPTION_MAX_BATCH: int = 10000
+
+    # Журнал доступа к данным пациентов: буфер в памяти, сброс пачками в отдельную базу
+    AUDIT_ENABLED: bool = True
+    AUDIT_DB_PATH: str = "audit.db"
+    AUDIT_BUFFER_SIZE: int = 100000
+    AUDIT_FLUSH_SIZE: int = 1000
+    AUDIT_FLUSH_INTERVAL_MS: float = 1000.0
+
+    # Контроль допуска: лимиты одновременных запросов по классам маршрутов (0 — без лимита),
+    # длина очереди ожидающих и максимальное ожидание; сверх этого — 503 + Retry-After.
+    # Общий лимит классов с БД — по размеру пула (DB_POOL_SIZE + DB_MAX_OVERFLOW) за вычетом
+    # соединений писателя, опроса событий и фоновых задач, иначе лишние запросы ждут пул и получают 500
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_TOTAL_LIMIT: int = 16
+    ADMISSION_LIMITS: Dict[str, int] = {"auth": 8, "read": 16, "write": 8, "export": 2, "stream": 500}
+    ADMISSION_QUEUE_SIZES: Dict[str, int] = {"auth": 32, "read": 128, "write": 64, "export": 4}
+    ADMISSION_MAX_WAIT_MS: float = 2000.0
+    ADMISSION_RETRY_AFTER: int = 2
+    ADMISSION_ROUTES: Dict[str, str] = {
+        "/health": "health",
+        "/metrics": "health",
+        "/auth/": "auth",
+        "/export/": "export",
+        "/doctor/events": "stream",
+    }
+
+    # Production-запуск
+    WORKERS: int = 4
+    HOST: str = "127.0.0.1"
+    PORT: int = 5000
+    SKIP_INIT_DB: bool = False
 
     # ✅ Добавь эти две строки – они разрешают параметры из файла .env
     database_url: str = "sqlite:///./medical.db"
     debug: bool = True
+    data_dir: str = "data"
 
     class Config:
         env_file = ".env"
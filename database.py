@@ -1,15 +1,65 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, event, select
 from sqlalchemy.orm import sessionmaker
-from models import Base
+from models import Base, DoctorPatient, Prescription
+from panel import rebuild_panel
+from config import settings
+import metrics
+import profiling
+
+logger = logging.getLogger(__name__)
 
 DATABASE_URL = "sqlite:///./medical.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT
+)
+
+
+def apply_sqlite_pragmas(engine):
+    """Настройки SQLite для каждого нового соединения движка"""
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL: читатели не блокируются писателем, в том числе из других процессов
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+apply_sqlite_pragmas(engine)
+metrics.instrument_engine(engine)
+profiling.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all не добавляет новые индексы в уже существующие таблицы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    backfill_doctor_panel()
+
+
+def backfill_doctor_panel():
+    """Заполнить панель врача в базе, где назначения появились раньше таблицы doctor_patients"""
+    with SessionLocal() as session:
+        if session.scalar(select(DoctorPatient.doctor_id).limit(1)) is not None:
+            return
+        if session.scalar(select(Prescription.id).limit(1)) is None:
+            return
+        rows = rebuild_panel(session)
+        session.commit()
+    logger.info("Панель врача заполнена из назначений: %s связей", rows)
 
 def get_db():
+    profiling.track_thread()  # обработчики def выполняются в пуле потоков, а не в потоке event loop
     db = SessionLocal()
     try:
         yield db
@@ -0,0 +1,230 @@
+"""Рассылка изменений по пациентам подписчикам (server-sent events).
+
+Задания записи добавляют события в таблицу patient_events в той же транзакции,
+что и сами изменения (record(), record_ids()). Каждый воркер опрашивает таблицу
+по возрастанию id раз в SSE_POLL_INTERVAL_MS и раздает новые события своим
+подключениям, поэтому подписчик получает изменения, сделанные любым воркером.
+
+id события передается в поле id: потока; при переподключении с заголовком
+Last-Event-ID пропущенные события досылаются из таблицы (она хранит события
+SSE_EVENT_RETENTION_MINUTES минут). У каждого подключения ограниченный буфер:
+если клиент не успевает читать или пропустил слишком много, ему отправляется
+событие resync (перечитать карту целиком).
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, func
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+from database import SessionLocal
+from metrics import registry
+from models import PatientEvent
+import writer
+
+logger = logging.getLogger(__name__)
+
+sse_connections = registry.gauge('sse_connections', 'Открытые SSE-подключения')
+sse_events_published_total = registry.counter(
+    'sse_events_published_total', 'Опубликованные события', ('type',))
+sse_events_dropped_total = registry.counter(
+    'sse_events_dropped_total', 'События, вытесненные из переполненного буфера подключения')
+
+
+# ========== ЗАПИСЬ СОБЫТИЙ ==========
+
+def record(session, items):
+    """Добавить события (patient_id, type, data) в текущую транзакцию (задание писателя)"""
+    now = datetime.utcnow()
+    rows = [
+        {"patient_id": patient_id, "type": event_type, "created_at": now,
+         "data": json.dumps(data or {}, ensure_ascii=False, default=str)}
+        for patient_id, event_type, data in items
+    ]
+    if rows:
+        session.execute(insert(PatientEvent), rows)
+    for row in rows:
+        sse_events_published_total.inc(type=row["type"])
+    return len(rows)
+
+
+def record_ids(session, event_type, pairs, **data):
+    """Одно событие на пациента со списком id измененных строк: pairs — (patient_id, id)"""
+    ids = defaultdict(list)
+    for patient_id, row_id in pairs:
+        ids[patient_id].append(row_id)
+    return record(session, [(patient_id, event_type, {"ids": row_ids, **data})
+                            for patient_id, row_ids in ids.items()])
+
+
+def purge(session, before):
+    """Удалить события старше before (задание писателя)"""
+    return session.execute(delete(PatientEvent).where(PatientEvent.created_at < before)).rowcount
+
+
+def purge_expired():
+    before = datetime.utcnow() - timedelta(minutes=settings.SSE_EVENT_RETENTION_MINUTES)
+    return writer.execute(purge, before)
+
+
+# ========== ЧТЕНИЕ СОБЫТИЙ ==========
+
+def _to_event(row):
+    return {"id": row.id, "type": row.type, "patient_id": row.patient_id,
+            "at": row.created_at.isoformat(), "data": json.loads(row.data)}
+
+
+def read_events(after_id, patient_ids=None, limit=None):
+    """События с id > after_id по возрастанию id (для patient_ids — только их)"""
+    query = select(PatientEvent).where(PatientEvent.id > after_id).order_by(PatientEvent.id)
+    if patient_ids is not None:
+        query = query.where(PatientEvent.patient_id.in_(patient_ids))
+    if limit:
+        query = query.limit(limit)
+    with SessionLocal() as session:
+        return [_to_event(row) for row in session.scalars(query)]
+
+
+def event_id_range():
+    """(минимальный, максимальный) id хранимых событий; (None, None), если таблица пуста"""
+    with SessionLocal() as session:
+        return tuple(session.execute(select(func.min(PatientEvent.id), func.max(PatientEvent.id))).one())
+
+
+# ========== ПОДПИСКИ ==========
+
+class Subscription:
+    def __init__(self, patient_ids, buffer_size):
+        self.patient_ids = frozenset(patient_ids)
+        self.buffer = deque(maxlen=buffer_size)
+        self.resync_ids = set()  # пациенты, чьи события вытеснены из буфера
+        self.ready = asyncio.Event()
+
+    def push(self, event):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.resync_ids.add(self.buffer[0]["patient_id"])
+            sse_events_dropped_total.inc()
+        self.buffer.append(event)
+        self.ready.set()
+
+    def drain(self):
+        events = list(self.buffer)
+        self.buffer.clear()
+        self.ready.clear()
+        resync_ids, self.resync_ids = self.resync_ids, set()
+        return events, resync_ids
+
+
+class EventBus:
+    """Подписки воркера и фоновый опрос patient_events; все методы — в event loop приложения"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # patient_id -> подписки
+        self._last_id = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._poll())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def subscribe(self, patient_ids):
+        subscription = Subscription(patient_ids, settings.SSE_BUFFER_SIZE)
+        for patient_id in subscription.patient_ids:
+            self._subscribers[patient_id].add(subscription)
+        sse_connections.inc()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        for patient_id in subscription.patient_ids:
+            subscribers = self._subscribers.get(patient_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[patient_id]
+        sse_connections.dec()
+
+    def dispatch(self, event):
+        for subscription in self._subscribers.get(event["patient_id"], ()):
+            subscription.push(event)
+
+    async def _poll(self):
+        interval = settings.SSE_POLL_INTERVAL_MS / 1000
+        self._last_id = (await run_in_threadpool(event_id_range))[1] or 0
+        while True:
+            try:
+                if not self._subscribers:
+                    # Подписчиков нет — только сдвинуть позицию, не читая сами события
+                    self._last_id = (await run_in_threadpool(event_id_range))[1] or self._last_id
+                    await asyncio.sleep(interval)
+                    continue
+                events = await run_in_threadpool(read_events, self._last_id, None, settings.SSE_POLL_BATCH)
+                for event in events:
+                    self.dispatch(event)
+                    self._last_id = event["id"]
+                if len(events) < settings.SSE_POLL_BATCH:
+                    await asyncio.sleep(interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ошибка чтения событий пациентов")
+                await asyncio.sleep(interval)
+
+
+bus = EventBus()
+
+
+# ========== ПОТОК SSE ==========
+
+def _format(event_type, data, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _missed(patient_ids, last_event_id):
+    """События после last_event_id для переподключившегося клиента; None — нужен resync"""
+    first_id, _ = await run_in_threadpool(event_id_range)
+    if first_id is None or last_event_id < first_id - 1:
+        return None  # часть событий уже удалена из таблицы
+    events = await run_in_threadpool(read_events, last_event_id, patient_ids, settings.SSE_BUFFER_SIZE + 1)
+    return None if len(events) > settings.SSE_BUFFER_SIZE else events
+
+
+async def stream(patient_ids, last_event_id=None):
+    """Поток SSE по пациентам: события, resync при пропусках и heartbeat-комментарии"""
+    subscription = bus.subscribe(patient_ids)
+    sent_id = 0
+    try:
+        yield f"retry: {settings.SSE_RETRY_MS}\n" + _format("subscribed", {"patient_ids": sorted(subscription.patient_ids)})
+        if last_event_id is not None:
+            missed = await _missed(subscription.patient_ids, last_event_id)
+            if missed is None:
+                yield _format("resync", {"patient_ids": sorted(subscription.patient_ids)})
+            else:
+                for event in missed:
+                    sent_id = event["id"]
+                    yield _format(event["type"], event, event["id"])
+        while True:
+            try:
+                await asyncio.wait_for(subscription.ready.wait(), timeout=settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            events, resync_ids = subscription.drain()
+            if resync_ids:
+                yield _format("resync", {"patient_ids": sorted(resync_ids)})
+            for event in events:
+                if event["id"] <= sent_id:
+                    continue  # уже отправлено при досылке пропущенных
+                yield _format(event["type"], event, event["id"])
+    finally:
+        bus.unsubscribe(subscription)
@@ -0,0 +1,197 @@
+"""Потоковая выгрузка пациентов, назначений и жалоб в NDJSON, CSV и Parquet.
+
+Строки читаются серверным курсором пачками (yield_per) и сразу отдаются
+клиенту, поэтому память не зависит от объема выгрузки. Для инкрементальной
+выгрузки используется водяной знак updated_at: выгружаются строки с
+since < updated_at <= watermark, а watermark возвращается для следующего запуска.
+
+Пример:
+    python export.py complaints --format csv --gzip --since 2026-01-01T00:00:00 --out complaints.csv.gz
+"""
+import argparse
+import csv
+import enum
+import io
+import json
+import os
+import tempfile
+import zlib
+from datetime import datetime
+
+from sqlalchemy import select, func, types
+
+from database import SessionLocal
+from models import Patient, Prescription, Complaint
+from projection import to_json_value
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet — необязательная зависимость
+    pyarrow = None
+
+ENTITIES = {
+    'patients': Patient,
+    'prescriptions': Prescription,
+    'complaints': Complaint,
+}
+FORMATS = ('ndjson', 'csv', 'parquet')
+MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+CHUNK_SIZE = 5000
+
+
+def columns(entity):
+    return [column.name for column in ENTITIES[entity].__table__.columns]
+
+
+def watermark(entity, since=None):
+    """Максимальный updated_at среди строк после since (None — выгружать нечего)"""
+    model = ENTITIES[entity]
+    query = select(func.max(model.updated_at))
+    if since:
+        query = query.where(model.updated_at > since)
+    with SessionLocal() as session:
+        return session.execute(query).scalar()
+
+
+def iter_chunks(entity, since=None, until=None, chunk_size=CHUNK_SIZE, convert=to_json_value):
+    """Пачки строк (кортежей) в порядке updated_at, id; читаются серверным курсором"""
+    model = ENTITIES[entity]
+    table = model.__table__
+    query = select(table).order_by(table.c.updated_at, table.c.id).execution_options(yield_per=chunk_size)
+    if since:
+        query = query.where(table.c.updated_at > since)
+    if until:
+        query = query.where(table.c.updated_at <= until)
+
+    with SessionLocal() as session:
+        for partition in session.execute(query).partitions():
+            yield [tuple(convert(value) for value in row) for row in partition]
+
+
+# ========== ФОРМАТЫ ==========
+
+def iter_ndjson(entity, chunks):
+    names = columns(entity)
+    for chunk in chunks:
+        yield ''.join(json.dumps(dict(zip(names, row)), ensure_ascii=False) + '\n' for row in chunk).encode()
+
+
+def iter_csv(entity, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns(entity))
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_stream(parts):
+    """Сжать поток байтов в gzip на лету"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for part in parts:
+        data = compressor.compress(part)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(entity, fmt, since=None, until=None, gzip=False):
+    """Поток байтов выгрузки в формате ndjson/csv (опционально gzip)"""
+    chunks = iter_chunks(entity, since, until)
+    parts = iter_ndjson(entity, chunks) if fmt == 'ndjson' else iter_csv(entity, chunks)
+    return gzip_stream(parts) if gzip else parts
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, types.Integer):
+        return pyarrow.int64()
+    if isinstance(column_type, types.Float):
+        return pyarrow.float64()
+    if isinstance(column_type, types.Boolean):
+        return pyarrow.bool_()
+    if isinstance(column_type, types.DateTime):
+        return pyarrow.timestamp('us')
+    if isinstance(column_type, types.Date):
+        return pyarrow.date32()
+    return pyarrow.string()
+
+
+def parquet_schema(entity):
+    """Схема Parquet по типам колонок модели, а не по первой пачке: колонка, пустая
+    в начале выгрузки, иначе получила бы тип null и не приняла бы последующие значения"""
+    return pyarrow.schema([
+        pyarrow.field(column.name, _arrow_type(column.type), nullable=column.nullable)
+        for column in ENTITIES[entity].__table__.columns
+    ])
+
+
+def _parquet_value(value):
+    return value.value if isinstance(value, enum.Enum) else value
+
+
+def write_parquet(entity, path, since=None, until=None, gzip=False):
+    """Записать выгрузку в Parquet-файл по группам строк (нужен pyarrow)"""
+    if pyarrow is None:
+        raise RuntimeError("Для Parquet установите pyarrow")
+    names = columns(entity)
+    schema = parquet_schema(entity)
+    with pyarrow.parquet.ParquetWriter(path, schema, compression='gzip' if gzip else 'snappy') as writer:
+        for chunk in iter_chunks(entity, since, until, convert=_parquet_value):
+            writer.write_table(pyarrow.Table.from_pylist([dict(zip(names, row)) for row in chunk], schema=schema))
+
+
+def parquet_tempfile(entity, since=None, until=None, gzip=False):
+    """Parquet во временный файл; путь удаляет вызывающий"""
+    fd, path = tempfile.mkstemp(suffix='.parquet')
+    os.close(fd)
+    try:
+        write_parquet(entity, path, since, until, gzip)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def filename(entity, fmt, gzip):
+    return f"{entity}.{fmt}" + ('.gz' if gzip and fmt != 'parquet' else '')
+
+
+# ========== КОМАНДНАЯ СТРОКА ==========
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка данных Medical API")
+    parser.add_argument('entity', choices=ENTITIES)
+    parser.add_argument('--format', choices=FORMATS, default='ndjson')
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None,
+                        help="выгрузить строки с updated_at после этой отметки")
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    out = args.out or filename(args.entity, args.format, args.gzip)
+    until = watermark(args.entity, args.since)
+    if until is None:
+        print("⚠️ Новых строк нет")
+        return
+
+    if args.format == 'parquet':
+        write_parquet(args.entity, out, args.since, until, args.gzip)
+    else:
+        with open(out, 'wb') as f:
+            for part in iter_export(args.entity, args.format, args.since, until, args.gzip):
+                f.write(part)
+    print(f"✅ {out}")
+    print(f"   Водяной знак (--since для следующей выгрузки): {until.isoformat()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""Генератор синтетических CSV в форматах папки data/ для нагрузочного тестирования импорта и API.
+
+Пример:
+    python generate_data.py --out data_bench --patients 1000000 --doctors 10000 \
+        --prescriptions 20000000 --complaints 20000000 --seed 42
+"""
+import argparse
+import csv
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+
+ENCODING = 'cp1251'
+
+# ========== СПРАВОЧНИКИ ==========
+
+SYMPTOM_CATEGORIES = [
+    'Сердечно-сосудистые', 'Неврологические', 'Дыхательные', 'Желудочно-кишечные',
+    'Эндокринные', 'Иммунные', 'Кожные', 'Метаболические'
+]
+
+SYMPTOMS = [
+    ('Головная боль', 'Регулярные головные боли утром', 'Неврологические'),
+    ('Повышенная жажда', 'Частое чувство жажды', 'Эндокринные'),
+    ('Одышка при физической нагрузке', 'Трудность дыхания при ходьбе', 'Сердечно-сосудистые'),
+    ('Боль в груди', 'Давящая боль за грудиной', 'Сердечно-сосудистые'),
+    ('Усталость', 'Постоянная слабость', 'Метаболические'),
+    ('Потливость', 'Повышенное потоотделение', 'Эндокринные'),
+    ('Головокружение', 'Ощущение неустойчивости', 'Неврологические'),
+    ('Сухость кожи', 'Шелушение и зуд', 'Кожные'),
+    ('Кашель', 'Сухой кашель по ночам', 'Дыхательные'),
+    ('Изжога', 'Жжение за грудиной после еды', 'Желудочно-кишечные'),
+    ('Тошнота', 'Тошнота по утрам', 'Желудочно-кишечные'),
+    ('Сердцебиение', 'Ощущение учащенного сердцебиения', 'Сердечно-сосудистые'),
+    ('Частые простуды', 'Более 4 ОРВИ в год', 'Иммунные'),
+    ('Онемение конечностей', 'Покалывание в пальцах', 'Неврологические'),
+    ('Прибавка веса', 'Набор веса без изменения питания', 'Метаболические'),
+    ('Сыпь', 'Зудящая сыпь на коже', 'Кожные'),
+]
+
+DIAGNOSES = [
+    ('I48', 'Фибрилляция предсердий', 'Кардиология'),
+    ('E66.9', 'Ожирение, неуточненное', 'Эндокринология'),
+    ('I25.1', 'Атеросклеротическая болезнь сердца', 'Кардиология'),
+    ('E03.9', 'Гипотиреоз, неуточненный', 'Эндокринология'),
+    ('E78.5', 'Дислипидемия, неуточненная', 'Эндокринология'),
+    ('I21.9', 'Острый инфаркт миокарда, неуточненный', 'Кардиология'),
+    ('I10', 'Эссенциальная (первичная) гипертензия', 'Кардиология'),
+    ('E05.9', 'Тиреотоксикоз, неуточненный', 'Эндокринология'),
+    ('E11', 'Сахарный диабет 2 типа', 'Эндокринология'),
+    ('I50.9', 'Сердечная недостаточность, неуточненная', 'Кардиология'),
+    ('G43.9', 'Мигрень неуточненная', 'Неврология'),
+    ('J45.9', 'Астма неуточненная', 'Пульмонология'),
+    ('K21.9', 'Гастроэзофагеальный рефлюкс без эзофагита', 'Гастроэнтерология'),
+    ('L20.9', 'Атопический дерматит неуточненный', 'Дерматология'),
+]
+
+SPECIALIZATIONS = [
+    'Кардиолог', 'Гастроэнтеролог', 'Хирург-онколог', 'Невролог', 'Эндокринолог',
+    'Терапевт', 'Хирург', 'Педиатр', 'Пульмонолог', 'Дерматолог'
+]
+
+DEPARTMENTS = [
+    'Онкология', 'Терапия', 'Психиатрия', 'Эндокринология', 'Офтальмология',
+    'Неврология', 'Педиатрия', 'Кардиология', 'Хирургия', 'Пульмонология'
+]
+
+SURNAME_ROOTS = [
+    'Петров', 'Иванов', 'Попов', 'Смирнов', 'Соколов', 'Лебедев', 'Кузнецов', 'Новиков',
+    'Морозов', 'Волков', 'Орлов', 'Еретяков', 'Чижов', 'Козлов', 'Зайцев', 'Павлов',
+    'Семенов', 'Голубев', 'Виноградов', 'Богданов', 'Воробьев', 'Федоров', 'Михайлов', 'Беляев',
+    'Тарасов', 'Белов', 'Комаров', 'Киселев', 'Макаров', 'Андреев', 'Ковалев', 'Ильин',
+    'Гусев', 'Титов', 'Кузьмин', 'Кудрявцев', 'Баранов', 'Куликов', 'Алексеев', 'Степанов'
+]
+
+MALE_NAMES = [
+    'Александр', 'Иван', 'Пётр', 'Андрей', 'Дмитрий', 'Алексей', 'Сергей', 'Михаил',
+    'Николай', 'Владимир', 'Егор', 'Максим', 'Артем', 'Роман', 'Олег', 'Юрий',
+    'Виктор', 'Евгений', 'Константин', 'Павел', 'Григорий', 'Василий', 'Антон', 'Илья'
+]
+
+FEMALE_NAMES = [
+    'Юлия', 'Анастасия', 'Мария', 'Ольга', 'Елена', 'Татьяна', 'Наталья', 'Ирина',
+    'Светлана', 'Екатерина', 'Анна', 'Дарья', 'Ксения', 'Полина', 'Вера', 'Галина',
+    'Алина', 'Виктория', 'Людмила', 'Марина', 'Валентина', 'Надежда', 'Софья', 'Алёна'
+]
+
+PATRONIM_ROOTS = [
+    'Иванов', 'Петров', 'Александров', 'Алексеев', 'Дмитриев', 'Сергеев', 'Михайлов',
+    'Андреев', 'Николаев', 'Владимиров', 'Юрьев', 'Олегов', 'Викторов', 'Павлов',
+    'Григорьев', 'Константинов'
+]
+
+CITIES = ['Москва', 'Вологда', 'Сокол', 'Череповец', 'Ярославль', 'Кострома', 'Тверь']
+STREETS = ['Дальняя', 'пр-кт Победы', 'Польская', 'Ленина', 'Советская', 'Садовая', 'Мира']
+BUILDINGS = ['1', '11Б', '1234/2', '2 к. 2', '15', '7А', '42']
+PATIENT_DOMAINS = ['mail.ru', 'gmail.com', 'yandex.ru']
+DOCTOR_DOMAINS = ['mail.ru', 'hospital.ru', 'clinic.org', 'medmail.com', 'health-center.info']
+
+MEDICATIONS = [
+    'Гидрохлоротиазид', 'Лосартан', 'Розувастатин', 'Левотироксин', 'Сибутрамин',
+    'Симвастатин', 'Аторвастатин', 'Глимепирид', 'Эналаприл', 'Бисопролол', 'Метформин'
+]
+QUANTITIES = ['1', '2', '2.5', '5', '10', '20', '25', '50', '100', '200', '1000', '5000']
+DOSE_UNITS = ['мг', 'мл', 'таблетка', 'капсула']
+FREQUENCIES = [
+    '1 раз в день', '2 раза в день', '3 раза в день', 'Каждые 6 часов',
+    'Перед сном', 'Утром натощак', 'После еды', 'По требованию'
+]
+DURATIONS = [7, 14, 21, 30, 60, 90, 180]
+INSTRUCTIONS = [
+    'Контроль функции щитовидной железы каждые 3 месяца', 'Принимать утром натощак',
+    'При головокружении — прекратить приём', 'Контроль АД 2 раза в день',
+    'Принимать во время еды', 'С осторожностью при почечной недостаточности',
+    'Не совмещать с алкоголем', 'Контроль глюкозы натощак'
+]
+
+SEVERITIES = ['Легкая', 'Умеренная', 'Тяжелая']
+COMPLAINT_DESCRIPTIONS = [
+    'Умеренная головная боль сопровождается тошнотой.', 'Часто хочется пить особенно ночью.',
+    'Появилась после подъёма по лестнице.', 'Давящая боль за грудиной длится >10 мин.',
+    'Беспокоит последние несколько дней.', 'Усиливается к вечеру.', ''
+]
+
+BIRTH_DATE_FORMATS = ['%d.%m.%Y', '%d.%m.%y', '%Y-%m-%d']
+BAD_DATES = ['31.02.2001', '00.00.0000', 'не указано', '2001-13-45', '']
+
+# Фамилии: простые и двойные ("Петров-Иванов"), чтобы ФИО хватило на миллион человек
+SURNAME_PARTS = [(root,) for root in SURNAME_ROOTS] + [
+    (first, second) for first in SURNAME_ROOTS for second in SURNAME_ROOTS if first != second
+]
+SURNAMES = len(SURNAME_PARTS)
+NAMES = len(MALE_NAMES)
+PATRONIMS = len(PATRONIM_ROOTS)
+# Число различных ФИО: person_fio(i) уникально для i < FIO_SPACE
+FIO_SPACE = 2 * SURNAMES * NAMES * PATRONIMS
+
+
+# ========== ДЕТЕРМИНИРОВАННЫЕ ФИО ==========
+
+def person_fio(index):
+    """ФИО и пол человека по его порядковому номеру (без хранения списка в памяти).
+
+    Разные номера меньше FIO_SPACE дают разные ФИО.
+    """
+    female = index % 2 == 1
+    k = index // 2
+    parts = SURNAME_PARTS[k % SURNAMES]
+    name_pool = FEMALE_NAMES if female else MALE_NAMES
+    name = name_pool[(k // SURNAMES) % NAMES]
+    patronim_root = PATRONIM_ROOTS[(k // (SURNAMES * NAMES)) % PATRONIMS]
+    if female:
+        return '-'.join(part + 'а' for part in parts), name, patronim_root + 'на', 'ж'
+    return '-'.join(parts), name, patronim_root + 'ич', 'м'
+
+
+def fio_variant(rng, fio, dirty):
+    """Вариант написания ФИО в ссылающихся файлах: регистр, пропущенное отчество"""
+    surname, name, patronim = fio
+    if rng.random() >= dirty:
+        return [surname, name, patronim]
+    kind = rng.randrange(3)
+    if kind == 0:
+        return [surname.upper(), name.upper(), patronim.upper()]
+    if kind == 1:
+        return [surname.lower(), name, patronim.lower()]
+    return [surname, name, '']
+
+
+def random_date(rng, start, days):
+    return start + timedelta(days=rng.randrange(days))
+
+
+# ========== ЗАПИСЬ ФАЙЛОВ ==========
+
+def open_csv(out_dir, filename, delimiter=','):
+    f = open(os.path.join(out_dir, filename), 'w', encoding=ENCODING, newline='')
+    return f, csv.writer(f, delimiter=delimiter, lineterminator='\n')
+
+
+def write_reference(out_dir):
+    f, w = open_csv(out_dir, 'symptom_categories.csv')
+    with f:
+        w.writerow(['Name'])
+        w.writerows([c] for c in SYMPTOM_CATEGORIES)
+
+    f, w = open_csv(out_dir, 'symptoms.csv')
+    with f:
+        w.writerow(['Name', 'Description', 'CategoryName'])
+        w.writerows(SYMPTOMS)
+
+    f, w = open_csv(out_dir, 'diagnoses.csv', delimiter=';')
+    with f:
+        w.writerow(['Код МКБ-10', 'Название диагноза', 'Категория'])
+        w.writerows(DIAGNOSES)
+    print(f"   ✅ Справочники: {len(SYMPTOM_CATEGORIES)} категорий, "
+          f"{len(SYMPTOMS)} симптомов, {len(DIAGNOSES)} диагнозов")
+
+
+def write_doctors(out_dir, rng, count, first, dirty):
+    """Врачи получают ФИО с номерами first.., после пациентов, чтобы не совпадать с ними"""
+    f, w = open_csv(out_dir, 'doctors.csv')
+    with f:
+        w.writerow(['ФИО', 'ФИО', 'ФИО', 'Специальность', 'Отделение', 'Email', 'НомерТелефона'])
+        for i in range(count):
+            surname, name, patronim, _ = person_fio(first + i)
+            email = f"{name.lower()}.{surname.lower()}{i}@{rng.choice(DOCTOR_DOMAINS)}"
+            if rng.random() < dirty:
+                patronim = ''
+            w.writerow([
+                surname, name, patronim,
+                rng.choice(SPECIALIZATIONS), rng.choice(DEPARTMENTS),
+                email, f"7{rng.randrange(10 ** 8, 10 ** 9)}"
+            ])
+    print(f"   ✅ Врачей: {count}")
+
+
+def write_patients(out_dir, rng, count, dirty):
+    f, w = open_csv(out_dir, 'patient.csv')
+    start = date(1930, 1, 1)
+    previous_email = None
+    with f:
+        w.writerow(['ФИО', '', '', 'Пол', 'Город', 'Улица', 'Строение', 'Почта',
+                    'Дата рождения', 'Номер Телефона'])
+        for i in range(count):
+            surname, name, patronim, gender = person_fio(i)
+            email = f"{surname}.{name}.{patronim}{i}@{rng.choice(PATIENT_DOMAINS)}"
+            birth_date = random_date(rng, start, 365 * 95).strftime(rng.choice(BIRTH_DATE_FORMATS))
+
+            # Грязные данные: дубликат почты, неверная дата, нестандартный пол
+            if previous_email and rng.random() < dirty:
+                email = previous_email
+            if rng.random() < dirty:
+                birth_date = rng.choice(BAD_DATES)
+            if rng.random() < dirty:
+                gender = rng.choice(['male', 'мужской', 'Ж', ''])
+
+            w.writerow([
+                surname, name, patronim, gender,
+                rng.choice(CITIES), rng.choice(STREETS), rng.choice(BUILDINGS),
+                email, birth_date, f"7{rng.randrange(10 ** 10, 10 ** 11)}"
+            ])
+            previous_email = email
+            if (i + 1) % 100000 == 0:
+                print(f"   … пациентов: {i + 1}")
+    print(f"   ✅ Пациентов: {count}")
+
+
+def write_prescriptions(out_dir, rng, count, patients, doctors, dirty):
+    f, w = open_csv(out_dir, 'prescriptions.csv')
+    start = datetime(2024, 1, 1)
+    with f:
+        w.writerow(['Patient_FIO', '', '', 'Doctor_FIO', '', '', 'Medication_Name', 'Quantity',
+                    'Dose_Unit', 'Frequency', 'DurationInDays', 'StartDate', 'EndDate',
+                    'Instructions', 'Status', 'CreatedAt'])
+        for i in range(count):
+            patient = fio_variant(rng, person_fio(rng.randrange(patients))[:3], dirty)
+            doctor = fio_variant(rng, person_fio(patients + rng.randrange(doctors))[:3], dirty)
+            duration = rng.choice(DURATIONS)
+            start_date = random_date(rng, start, 365 * 3)
+            end_date = (start_date + timedelta(days=duration)).strftime('%Y-%m-%d')
+            created_at = start_date - timedelta(hours=rng.randrange(72))
+            status = 'активно' if rng.random() < 0.4 else 'завершено'
+
+            if rng.random() < dirty:
+                end_date = ''
+            if rng.random() < dirty:
+                status = rng.choice(['active', '1', 'отменено'])
+
+            w.writerow(patient + doctor + [
+                rng.choice(MEDICATIONS), rng.choice(QUANTITIES), rng.choice(DOSE_UNITS),
+                rng.choice(FREQUENCIES), duration, start_date.strftime('%Y-%m-%d'), end_date,
+                rng.choice(INSTRUCTIONS), status, created_at.strftime('%Y-%m-%d %H:%M:%S')
+            ])
+            if (i + 1) % 1000000 == 0:
+                print(f"   … назначений: {i + 1}")
+    print(f"   ✅ Назначений: {count}")
+
+
+def write_complaints(out_dir, rng, count, patients, dirty):
+    f, w = open_csv(out_dir, 'patient_complaints.csv')
+    start = date(2024, 1, 1)
+    with f:
+        w.writerow(['Patient_FIO', '', '', 'Symptom_Name', 'ComplaintDate', 'Severity', 'Description'])
+        for i in range(count):
+            patient = fio_variant(rng, person_fio(rng.randrange(patients))[:3], dirty)
+            symptom = rng.choice(SYMPTOMS)[0]
+            complaint_date = random_date(rng, start, 365 * 3).strftime('%Y-%m-%d')
+            severity = rng.choice(SEVERITIES)
+
+            if rng.random() < dirty:
+                symptom = symptom.lower()
+            if rng.random() < dirty:
+                complaint_date = rng.choice(BAD_DATES)
+            if rng.random() < dirty:
+                severity = ''
+
+            w.writerow(patient + [symptom, complaint_date, severity, rng.choice(COMPLAINT_DESCRIPTIONS)])
+            if (i + 1) % 1000000 == 0:
+                print(f"   … жалоб: {i + 1}")
+    print(f"   ✅ Жалоб: {count}")
+
+
+def generate(out_dir, patients, doctors, prescriptions, complaints, seed=42, dirty=0.01):
+    """Сгенерировать полный набор CSV в папку out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    # Отдельный поток случайных чисел на каждый файл: объем одного файла не влияет на другие
+    write_reference(out_dir)
+    write_doctors(out_dir, random.Random(f"{seed}:doctors"), doctors, patients, dirty)
+    write_patients(out_dir, random.Random(f"{seed}:patients"), patients, dirty)
+    write_prescriptions(out_dir, random.Random(f"{seed}:prescriptions"), prescriptions,
+                        patients, doctors, dirty)
+    write_complaints(out_dir, random.Random(f"{seed}:complaints"), complaints, patients, dirty)
+
+    print(f"   ⏱ {time.perf_counter() - started:.1f} c")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерация синтетических CSV для нагрузочных тестов")
+    parser.add_argument('--out', default='data_bench', help="папка для CSV (по умолчанию data_bench)")
+    parser.add_argument('--patients', type=int, default=1000000)
+    parser.add_argument('--doctors', type=int, default=10000)
+    parser.add_argument('--prescriptions', type=int, default=10000000)
+    parser.add_argument('--complaints', type=int, default=10000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dirty', type=float, default=0.01,
+                        help="доля строк с грязными данными (0..1)")
+    args = parser.parse_args()
+
+    if args.patients < 1 or args.doctors < 1:
+        parser.error("нужен хотя бы один пациент и один врач")
+    if args.patients + args.doctors > FIO_SPACE:
+        parser.error(f"различных ФИО хватает на {FIO_SPACE} человек (пациенты + врачи), "
+                     f"запрошено {args.patients + args.doctors}")
+
+    print("=" * 60)
+    print(f"🧪 ГЕНЕРАЦИЯ ДАННЫХ В {args.out}")
+    print("=" * 60)
+    generate(args.out, args.patients, args.doctors, args.prescriptions, args.complaints,
+             seed=args.seed, dirty=args.dirty)
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,10 @@ from models import (
     Specialization, Department
 )
 from utils import get_password_hash, safe_str, parse_date
+from analytics import record_complaints
+from twin import refresh_twin_states
+from panel import rebuild_panel
+from config import settings
 import os
 
 
@@ -28,6 +32,17 @@ def parse_datetime(dt_str):
     return None
 
 
+def data_path(filename):
+    """Путь к CSV в папке с данными (settings.data_dir)"""
+    return os.path.join(settings.data_dir, filename)
+
+
+def row_fio(row, start):
+    """ФИО из трех соседних колонок строки, начиная с позиции start"""
+    parts = [safe_str(value) for value in row.iloc[start:start + 3]]
+    return ' '.join(part for part in parts if part) or None
+
+
 def get_or_create(session, model, defaults=None, **kwargs):
     """Найти или создать запись в БД"""
     instance = session.query(model).filter_by(**kwargs).first()
@@ -41,7 +56,7 @@ def get_or_create(session, model, defaults=None, **kwargs):
 
 
 def import_symptom_categories(session):
-    df = pd.read_csv('data/symptom_categories.csv', sep=',', encoding='cp1251')
+    df = pd.read_csv(data_path('symptom_categories.csv'), sep=',', encoding='cp1251')
     count = 0
     for _, row in df.iterrows():
         name = safe_str(row.get('Name'))
@@ -52,7 +67,7 @@ def import_symptom_categories(session):
 
 
 def import_symptoms(session):
-    df = pd.read_csv('data/symptoms.csv', sep=',', encoding='cp1251')
+    df = pd.read_csv(data_path('symptoms.csv'), sep=',', encoding='cp1251')
     count = 0
     for _, row in df.iterrows():
         category_name = safe_str(row.get('CategoryName'))
@@ -71,7 +86,7 @@ def import_symptoms(session):
 
 def import_diagnoses(session):
     try:
-        df = pd.read_csv('data/diagnoses.csv', sep=';', encoding='cp1251')
+        df = pd.read_csv(data_path('diagnoses.csv'), sep=';', encoding='cp1251')
         count = 0
         for _, row in df.iterrows():
             code = safe_str(row.get('Код МКБ-10'))
@@ -89,7 +104,7 @@ def import_diagnoses(session):
 
 def import_specializations_departments(session):
     try:
-        df = pd.read_csv('data/doctors.csv', sep=',', encoding='cp1251', header=None, skiprows=1)
+        df = pd.read_csv(data_path('doctors.csv'), sep=',', encoding='cp1251', header=None, skiprows=1)
         df.columns = ['surname', 'name', 'patronim', 'specialization', 'department', 'email', 'phone']
 
         spec_count = 0
@@ -112,7 +127,7 @@ def import_specializations_departments(session):
 
 def import_doctors(session):
     try:
-        df = pd.read_csv('data/doctors.csv', sep=',', encoding='cp1251', header=None, skiprows=1)
+        df = pd.read_csv(data_path('doctors.csv'), sep=',', encoding='cp1251', header=None, skiprows=1)
         df.columns = ['surname', 'name', 'patronim', 'specialization', 'department', 'email', 'phone']
     except FileNotFoundError:
         print("   ❌ Файл doctors.csv не найден!")
@@ -160,7 +175,7 @@ def import_doctors(session):
 
 def import_patients(session):
     try:
-        df = pd.read_csv('data/patient.csv', sep=',', encoding='cp1251', header=None, skiprows=1)
+        df = pd.read_csv(data_path('patient.csv'), sep=',', encoding='cp1251', header=None, skiprows=1)
         df.columns = ['surname', 'name', 'patronim', 'gender', 'city', 'street', 'building',
                       'email', 'birth_date', 'phone']
     except FileNotFoundError:
@@ -212,7 +227,7 @@ def import_patients(session):
 
 def import_prescriptions(session):
     try:
-        df = pd.read_csv('data/prescriptions.csv', sep=',', encoding='cp1251')
+        df = pd.read_csv(data_path('prescriptions.csv'), sep=',', encoding='cp1251')
         if 'Patient_FIO' not in df.columns:
             print("   ⚠️ Пропускаем назначения: неверный формат файла")
             return
@@ -227,8 +242,8 @@ def import_prescriptions(session):
 
     count = 0
     for _, row in df.iterrows():
-        patient_fio = safe_str(row.get('Patient_FIO'))
-        doctor_fio = safe_str(row.get('Doctor_FIO'))
+        patient_fio = row_fio(row, 0)
+        doctor_fio = row_fio(row, 3)
 
         if not patient_fio or not doctor_fio:
             continue
@@ -262,7 +277,7 @@ def import_prescriptions(session):
 
 def import_complaints(session):
     try:
-        df = pd.read_csv('data/patient_complaints.csv', sep=',', encoding='cp1251')
+        df = pd.read_csv(data_path('patient_complaints.csv'), sep=',', encoding='cp1251')
         if 'Patient_FIO' not in df.columns:
             print("   ⚠️ Пропускаем жалобы: неверный формат файла")
             return
@@ -274,9 +289,9 @@ def import_complaints(session):
                 for p in session.query(Patient).all()}
     symptoms = {s.name.strip().lower(): s for s in session.query(Symptom).all()}
 
-    count = 0
+    imported = []
     for _, row in df.iterrows():
-        patient_fio = safe_str(row.get('Patient_FIO'))
+        patient_fio = row_fio(row, 0)
         symptom_name = safe_str(row.get('Symptom_Name'))
 
         if not patient_fio or not symptom_name:
@@ -294,8 +309,11 @@ def import_complaints(session):
                 description=safe_str(row.get('Description'))
             )
             session.add(complaint)
-            count += 1
-    print(f"   ✅ Жалоб: {count}")
+            imported.append(complaint)
+
+    # Сводка для аналитики обновляется одной пачкой на весь файл
+    record_complaints(session, imported, categories={s.id: s.category_id for s in symptoms.values()})
+    print(f"   ✅ Жалоб: {len(imported)}")
 
 
 def reset_and_import():
@@ -330,12 +348,17 @@ def reset_and_import():
 
         print("\n5. Импорт назначений...")
         import_prescriptions(session)
+        session.flush()  # autoflush выключен: панель строится запросом по уже записанным назначениям
+        print(f"   ✅ Связей врач — пациент: {rebuild_panel(session)}")
         session.commit()
 
         print("\n6. Импорт жалоб...")
         import_complaints(session)
         session.commit()
 
+        print("\n7. Расчет состояния пациентов...")
+        print(f"   ✅ Пациентов: {refresh_twin_states(session, full=True)}")
+
         print("\n" + "=" * 60)
         print("📊 СТАТИСТИКА ИМПОРТА")
         print("=" * 60)
@@ -361,8 +384,8 @@ def reset_and_import():
 
 
 if __name__ == "__main__":
-    if not os.path.exists('data'):
-        os.makedirs('data')
-        print("📁 Создана папка 'data'. Положите в нее CSV файлы.")
+    if not os.path.exists(settings.data_dir):
+        os.makedirs(settings.data_dir)
+        print(f"📁 Создана папка '{settings.data_dir}'. Положите в нее CSV файлы.")
     else:
         reset_and_import()
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""Фоновые задачи: периодический планировщик внутри приложения и запуск из командной строки.
+
+Пример:
+    python jobs.py expire-prescriptions --batch-size 5000
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, time
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from analytics import rebuild_complaint_stats
+from config import settings
+from database import SessionLocal
+from models import Prescription
+from models.prescription import STATUS_COMPLETED
+from twin import refresh_twin_states
+from panel import rebuild_panel
+import writer
+import events
+
+logger = logging.getLogger(__name__)
+
+
+# ========== НАЗНАЧЕНИЯ ==========
+
+def _expire_batch(session, cutoff, batch_size):
+    expired_ids = (
+        select(Prescription.id)
+        .where(Prescription.is_active(), Prescription.end_date < cutoff)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    statement = (
+        update(Prescription)
+        .where(Prescription.id.in_(expired_ids))
+        # Отметка времени берется внутри задания писателя (под блокировкой записи), а не при
+        # постановке в очередь: иначе строка могла бы зафиксироваться с updated_at ниже
+        # водяного знака уже сделанной выгрузки и пропасть из инкрементальных выгрузок
+        .values(status=STATUS_COMPLETED, updated_at=datetime.utcnow())
+        .returning(Prescription.patient_id, Prescription.id)
+        .execution_options(synchronize_session=False)
+    )
+    expired = session.execute(statement).all()
+    events.record_ids(session, 'prescription', expired, status=STATUS_COMPLETED)
+    return expired
+
+
+def expire_prescriptions(now=None, batch_size=None):
+    """Завершить активные назначения, у которых прошла end_date.
+
+    Обновление идет пачками UPDATE ... WHERE id IN (SELECT ... LIMIT n) через писателя БД,
+    каждая пачка — отдельная короткая транзакция, чтобы не держать блокировку записи надолго.
+    Назначение активно по день end_date включительно. Возвращает число завершенных назначений.
+    """
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.EXPIRE_BATCH_SIZE
+    cutoff = datetime.combine(now.date(), time.min)
+
+    total = 0
+    while True:
+        expired = writer.execute(_expire_batch, cutoff, batch_size)
+        total += len(expired)
+        if len(expired) < batch_size:
+            return total
+
+
+def expire_prescriptions_job():
+    expired = expire_prescriptions()
+    if expired:
+        logger.info("Завершено назначений: %s", expired)
+    return expired
+
+
+# ========== ЦИФРОВОЙ ДВОЙНИК ==========
+
+def refresh_twin_states_job():
+    with SessionLocal() as session:
+        refreshed = refresh_twin_states(session)
+    if refreshed:
+        logger.info("Пересчитано состояний пациентов: %s", refreshed)
+    return refreshed
+
+
+# ========== СОБЫТИЯ ПАЦИЕНТОВ ==========
+
+def purge_events_job():
+    purged = events.purge_expired()
+    if purged:
+        logger.info("Удалено старых событий пациентов: %s", purged)
+    return purged
+
+
+# ========== ПЛАНИРОВЩИК ==========
+
+async def run_periodically(job, interval, name):
+    """Выполнять блокирующую задачу в пуле потоков каждые interval секунд"""
+    while True:
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("Ошибка фоновой задачи %s", name)
+        await asyncio.sleep(interval)
+
+
+_scheduler_lock = None
+
+
+def start_scheduler():
+    """Запустить периодические задачи, вернуть список asyncio-задач для остановки.
+
+    При нескольких воркерах задачи выполняет только тот, кто первым взял
+    блокировку settings.SCHEDULER_LOCK_PATH; остальные возвращают пустой список.
+    """
+    global _scheduler_lock
+    _scheduler_lock = writer.try_lock(settings.SCHEDULER_LOCK_PATH)
+    if _scheduler_lock is None:
+        return []
+
+    schedule = [
+        (expire_prescriptions_job, settings.EXPIRE_PRESCRIPTIONS_INTERVAL, 'expire-prescriptions'),
+        (refresh_twin_states_job, settings.TWIN_REFRESH_INTERVAL, 'refresh-twin-states'),
+        (purge_events_job, settings.SSE_EVENTS_PURGE_INTERVAL, 'purge-events'),
+    ]
+    return [
+        asyncio.create_task(run_periodically(job, interval, name), name=name)
+        for job, interval, name in schedule
+        if interval > 0
+    ]
+
+
+async def stop_scheduler(tasks):
+    global _scheduler_lock
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if _scheduler_lock is not None:
+        _scheduler_lock.close()
+        _scheduler_lock = None
+
+
+# ========== КОМАНДНАЯ СТРОКА ==========
+
+def main():
+    parser = argparse.ArgumentParser(description="Фоновые задачи Medical API")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    expire = subparsers.add_parser('expire-prescriptions', help="завершить просроченные назначения")
+    expire.add_argument('--batch-size', type=int, default=settings.EXPIRE_BATCH_SIZE)
+
+    subparsers.add_parser('rebuild-complaint-stats', help="пересобрать сводку жалоб для аналитики")
+
+    subparsers.add_parser('rebuild-doctor-panel', help="пересобрать панели врачей из назначений")
+
+    twin = subparsers.add_parser('refresh-twin-states', help="пересчитать состояние пациентов")
+    twin.add_argument('--full', action='store_true', help="пересчитать всех, а не только измененных")
+
+    args = parser.parse_args()
+
+    if args.command == 'expire-prescriptions':
+        expired = expire_prescriptions(batch_size=args.batch_size)
+        print(f"✅ Завершено назначений: {expired}")
+    elif args.command == 'rebuild-complaint-stats':
+        with SessionLocal() as session:
+            rows = rebuild_complaint_stats(session)
+        print(f"✅ Строк сводки жалоб: {rows}")
+    elif args.command == 'rebuild-doctor-panel':
+        rows = writer.execute(rebuild_panel)
+        print(f"✅ Связей врач — пациент: {rows}")
+    elif args.command == 'refresh-twin-states':
+        with SessionLocal() as session:
+            refreshed = refresh_twin_states(session, full=args.full)
+        print(f"✅ Пересчитано состояний пациентов: {refreshed}")
+
+
+if __name__ == "__main__":
+    main()
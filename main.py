@@ -1,28 +1,85 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Header, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.responses import Response, FileResponse, StreamingResponse, JSONResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, timedelta
+from typing import Optional, Union
+from datetime import date, datetime, timedelta, time
+from contextlib import asynccontextmanager
 import uvicorn
+import argparse
+import os
 
-from database import get_db, init_db
-from models import User, Patient, Doctor, Prescription, Complaint
+from database import get_db, init_db, SessionLocal
+from models import User, Patient, Doctor, Prescription, Complaint, DoctorPatient
 from utils import (
     verify_password, create_access_token, create_refresh_token,
-    get_current_user, require_role
+    get_current_user, require_role, naive_utc
 )
 from config import settings
+import metrics
+import profiling
+import jobs
+import analytics
+import twin
+import writer
+import projection
+import export
+import audit
+import prescriptions
+import complaints
+import panel
+import admission
+import events
+
+# Инициализация БД (в production-режиме выполняется один раз до запуска воркеров)
+if not settings.SKIP_INIT_DB:
+    init_db()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.METRICS_MULTIPROCESS:
+        metrics.enable_multiprocess(settings.METRICS_DIR, settings.METRICS_SYNC_SECONDS).start()
+    writer.coordinator.start()
+    if settings.AUDIT_ENABLED:
+        audit.log.start()
+    await run_in_threadpool(complaints.catalog.load)
+    complaints.buffer.start()
+    events.bus.start()
+    tasks = jobs.start_scheduler() if settings.SCHEDULER_ENABLED else []
+    yield
+    await jobs.stop_scheduler(tasks)
+    await events.bus.stop()
+    await complaints.buffer.stop()
+    writer.coordinator.stop()
+    audit.log.stop()
+    if metrics.collector is not None:
+        metrics.collector.stop()
 
-# Инициализация БД
-init_db()
 
 app = FastAPI(
     title=settings.APP_NAME,
     description="API для медицинской информационной системы",
-    version=settings.VERSION
+    version=settings.VERSION,
+    lifespan=lifespan
 )
 
+# Контроль допуска и сброс нагрузки (внутри CORS, чтобы ответы 503 получали CORS-заголовки)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request, exc):
+    """Нет свободного соединения с БД за DB_POOL_TIMEOUT — перегрузка, а не ошибка сервера"""
+    return JSONResponse(status_code=503, content={"detail": "Сервер перегружен, повторите запрос позже"},
+                        headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)})
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +89,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Профилирование запросов по требованию
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Метрики Prometheus
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 
 # ========== БАЗОВЫЕ МЕТОДЫ ==========
 
@@ -45,8 +109,14 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Метрики в текстовом формате Prometheus (def: в --prod читает файлы всех воркеров, не в event loop)"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.post("/auth/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Авторизация пользователя"""
     user = db.query(User).filter(User.email == form_data.username).first()
 
@@ -75,46 +145,48 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 # ========== МЕТОДЫ ДЛЯ ПАЦИЕНТОВ ==========
 
 @app.get("/patient/profile")
-async def patient_profile(
+def patient_profile(
+        fields: Optional[str] = None,
         current_user: User = Depends(require_role("patient")),
         db: Session = Depends(get_db)
 ):
-    """Получить профиль текущего пациента"""
+    """Получить профиль текущего пациента (fields=surname,name,... — только эти поля)"""
     if not current_user.patient_id:
         raise HTTPException(status_code=404, detail="Профиль пациента не найден")
 
-    patient = db.query(Patient).filter(Patient.id == current_user.patient_id).first()
-    if not patient:
+    fields = projection.parse_fields(fields, tuple(projection.PATIENT_COLUMNS) + ("twin",),
+                                     projection.PROFILE_DEFAULT)
+    columns = projection.patient_columns(fields)
+    row = db.execute(select(*(columns or [Patient.id])).where(Patient.id == current_user.patient_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Пациент не найден")
 
-    return {
-        "surname": patient.surname,
-        "name": patient.name,
-        "patronim": patient.patronim,
-        "birth_date": patient.birth_date.isoformat() if patient.birth_date else None,
-        "gender": patient.gender,
-        "height": patient.height,
-        "weight": patient.weight,
-        "email": patient.email,
-        "phone": patient.phone,
-        "city": patient.city,
-        "street": patient.street,
-        "building": patient.building
-    }
+    audit.record(current_user, "patient.profile", current_user.patient_id)
+    result = projection.row_to_dict(row) if columns else {}
+    if "twin" in fields:
+        result["twin"] = twin.get_twin_state(db, current_user.patient_id)
+    return result
 
 
 @app.get("/patient/prescriptions")
-async def patient_prescriptions(
+def patient_prescriptions(
+        active: bool = False,
         current_user: User = Depends(require_role("patient")),
         db: Session = Depends(get_db)
 ):
-    """Получить список назначений текущего пациента"""
+    """Получить список назначений текущего пациента (active=true — только текущие)"""
     if not current_user.patient_id:
         raise HTTPException(status_code=404, detail="Профиль пациента не найден")
 
-    prescriptions = db.query(Prescription).filter(
-        Prescription.patient_id == current_user.patient_id
-    ).order_by(Prescription.start_date.desc()).all()
+    audit.record(current_user, "patient.prescriptions", current_user.patient_id)
+    query = db.query(Prescription).filter(Prescription.patient_id == current_user.patient_id)
+    if active:
+        today = datetime.combine(datetime.utcnow().date(), time.min)
+        query = query.filter(
+            Prescription.is_active(),
+            (Prescription.end_date.is_(None)) | (Prescription.end_date >= today)
+        )
+    prescriptions = query.order_by(Prescription.start_date.desc()).all()
 
     result = []
     for p in prescriptions:
@@ -137,7 +209,7 @@ async def patient_prescriptions(
 
 
 @app.get("/patient/complaints")
-async def patient_complaints(
+def patient_complaints(
         current_user: User = Depends(require_role("patient")),
         db: Session = Depends(get_db)
 ):
@@ -145,6 +217,7 @@ async def patient_complaints(
     if not current_user.patient_id:
         raise HTTPException(status_code=404, detail="Профиль пациента не найден")
 
+    audit.record(current_user, "patient.complaints", current_user.patient_id)
     complaints = db.query(Complaint).filter(
         Complaint.patient_id == current_user.patient_id
     ).order_by(Complaint.complaint_date.desc()).all()
@@ -163,7 +236,7 @@ async def patient_complaints(
 
 
 @app.get("/patient/measurements")
-async def patient_measurements(
+def patient_measurements(
         current_user: User = Depends(require_role("patient")),
         db: Session = Depends(get_db)
 ):
@@ -173,7 +246,7 @@ async def patient_measurements(
 
 
 @app.post("/patient/measurements")
-async def add_measurement(
+def add_measurement(
         current_user: User = Depends(require_role("patient")),
         db: Session = Depends(get_db)
 ):
@@ -182,68 +255,100 @@ async def add_measurement(
     return {"status": "ok", "message": "Измерение добавлено"}
 
 
-@app.post("/patient/complaints")
+@app.post("/patient/complaints", status_code=202)
 async def add_complaint(
-        current_user: User = Depends(require_role("patient")),
-        db: Session = Depends(get_db)
+        complaint: complaints.ComplaintIn,
+        response: Response,
+        ack: str = "buffered",
+        current_user: User = Depends(require_role("patient"))
 ):
-    """Добавить жалобу (заглушка)"""
-    # TODO: реализовать после добавления обработки тела запроса
-    return {"status": "ok", "message": "Жалоба добавлена"}
+    """Добавить жалобу.
+
+    ack=buffered (по умолчанию) — 202 сразу после приема в буфер, запись пачкой в фоне;
+    ack=committed — 201 после фиксации в БД, с id жалобы.
+    """
+    if not current_user.patient_id:
+        raise HTTPException(status_code=404, detail="Профиль пациента не найден")
+    if ack not in complaints.ACK_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"ack: одно из {', '.join(complaints.ACK_OPTIONS)}")
+
+    try:
+        complaint_id = await complaints.submit(current_user.patient_id, complaint, ack)
+    except complaints.BufferFull:
+        raise HTTPException(status_code=503, detail="Буфер жалоб переполнен, повторите запрос позже",
+                            headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)})
+
+    audit.record(current_user, "patient.complaint.create", current_user.patient_id)
+    if ack == "committed":
+        response.status_code = 201
+        return {"status": "ok", "id": complaint_id}
+    return {"status": "accepted"}
 
 
 # ========== МЕТОДЫ ДЛЯ ВРАЧЕЙ ==========
 
 @app.get("/doctor/patients")
-async def doctor_patients(
+def doctor_patients(
+        fields: Optional[str] = None,
+        limit: int = 50,
+        offset: int = 0,
         current_user: User = Depends(require_role("doctor")),
         db: Session = Depends(get_db)
 ):
-    """Получить список пациентов врача (заглушка)"""
-    # TODO: реализовать полноценный поиск пациентов
-    patients = db.query(Patient).limit(10).all()
-
-    result = []
-    for p in patients:
-        result.append({
-            "id": p.id,
-            "surname": p.surname,
-            "name": p.name,
-            "patronim": p.patronim,
-            "birth_date": p.birth_date.isoformat() if p.birth_date else None,
-            "gender": p.gender,
-            "email": p.email,
-            "phone": p.phone
-        })
-
-    return result
+    """Пациенты врача (по его назначениям), сначала недавние; fields=id,surname,name — только эти поля"""
+    if not current_user.doctor_id:
+        raise HTTPException(status_code=404, detail="Профиль врача не найден")
+    if limit < 1 or limit > 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit: от 1 до 500, offset: неотрицательный")
+
+    fields = projection.parse_fields(fields, tuple(projection.PATIENT_COLUMNS) + projection.PANEL_FIELDS,
+                                     projection.PATIENT_LIST_DEFAULT + ("last_contact",))
+    columns = projection.patient_columns(fields) + projection.panel_columns(fields)
+    query = (
+        select(*columns)
+        .select_from(DoctorPatient)
+        .join(Patient, Patient.id == DoctorPatient.patient_id)
+        .where(DoctorPatient.doctor_id == current_user.doctor_id)
+        .order_by(DoctorPatient.last_contact.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [projection.row_to_dict(row) for row in db.execute(query)]
 
 
 @app.get("/doctor/patient/{patient_id}/card")
-async def doctor_patient_card(
+def doctor_patient_card(
         patient_id: int,
+        fields: Optional[str] = None,
         current_user: User = Depends(require_role("doctor")),
         db: Session = Depends(get_db)
 ):
-    """Получить медицинскую карту пациента (заглушка)"""
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
+    """Медицинская карта пациента из панели врача (403 для чужих пациентов).
+
+    fields — поля пациента и/или разделы карты (twin, prescriptions, complaints, measurements);
+    без fields возвращается вся карта.
+    """
+    fields = projection.parse_fields(
+        fields, tuple(projection.PATIENT_COLUMNS) + projection.CARD_SECTIONS,
+        projection.CARD_PATIENT_DEFAULT + projection.CARD_SECTIONS
+    )
+    columns = projection.patient_columns(fields)
+    row = db.execute(select(*(columns or [Patient.id])).where(Patient.id == patient_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Пациент не найден")
-
-    prescriptions = db.query(Prescription).filter(Prescription.patient_id == patient_id).limit(20).all()
-    complaints = db.query(Complaint).filter(Complaint.patient_id == patient_id).limit(20).all()
-
-    return {
-        "patient": {
-            "surname": patient.surname,
-            "name": patient.name,
-            "patronim": patient.patronim,
-            "birth_date": patient.birth_date.isoformat() if patient.birth_date else None,
-            "gender": patient.gender,
-            "email": patient.email,
-            "phone": patient.phone
-        },
-        "prescriptions": [
+    if not panel.has_patient(db, current_user.doctor_id, patient_id):
+        audit.record(current_user, "doctor.card.denied", patient_id)
+        raise HTTPException(status_code=403, detail="Пациент не входит в панель врача")
+    audit.record(current_user, "doctor.card", patient_id, detail=",".join(fields)[:200])
+
+    result = {}
+    if columns:
+        result["patient"] = projection.row_to_dict(row)
+    if "twin" in fields:
+        result["twin"] = twin.get_twin_state(db, patient_id)
+    if "prescriptions" in fields:
+        prescriptions = db.query(Prescription).filter(Prescription.patient_id == patient_id).limit(20).all()
+        result["prescriptions"] = [
             {
                 "medication_name": p.medication_name,
                 "quantity": p.quantity,
@@ -252,35 +357,236 @@ async def doctor_patient_card(
                 "start_date": p.start_date.isoformat() if p.start_date else None,
                 "status": p.status
             } for p in prescriptions
-        ],
-        "complaints": [
+        ]
+    if "complaints" in fields:
+        complaints = db.query(Complaint).filter(Complaint.patient_id == patient_id).limit(20).all()
+        result["complaints"] = [
             {
                 "symptom_name": c.symptom.name if c.symptom else None,
                 "complaint_date": c.complaint_date.isoformat() if c.complaint_date else None,
                 "severity": c.severity,
                 "description": c.description
             } for c in complaints
-        ],
-        "measurements": []  # TODO: добавить измерения
-    }
+        ]
+    if "measurements" in fields:
+        result["measurements"] = []  # TODO: добавить измерения
+    return result
+
+
+def _accessible_patients(doctor_id, patient_ids):
+    with SessionLocal() as session:
+        return panel.accessible_patients(session, doctor_id, patient_ids)
 
 
-@app.post("/doctor/prescriptions")
+@app.get("/doctor/events")
+async def doctor_events(
+        patient_ids: str,
+        last_event_id: Optional[int] = Header(default=None),
+        current_user: User = Depends(require_role("doctor"))
+):
+    """Подписка на изменения пациентов (server-sent events) вместо опроса карты.
+
+    patient_ids — id через запятую. События: complaint, prescription (data.ids — id
+    измененных строк); resync — часть событий потеряна, карту нужно перечитать.
+    При переподключении с Last-Event-ID пропущенные события досылаются.
+    """
+    try:
+        ids = {int(i) for i in patient_ids.split(",") if i.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="patient_ids: список id через запятую")
+    if not ids or len(ids) > settings.SSE_MAX_PATIENTS:
+        raise HTTPException(status_code=400, detail=f"patient_ids: от 1 до {settings.SSE_MAX_PATIENTS} пациентов")
+
+    # Сессия только на время проверки доступа, а не на все время подписки
+    allowed = await run_in_threadpool(_accessible_patients, current_user.doctor_id, ids)
+    if allowed != ids:
+        for patient_id in ids - allowed:
+            audit.record(current_user, "doctor.events.denied", patient_id)
+        raise HTTPException(status_code=403, detail=f"Пациенты не входят в панель врача: "
+                                                    f"{', '.join(map(str, sorted(ids - allowed)))}")
+
+    for patient_id in ids:
+        audit.record(current_user, "doctor.events", patient_id)
+    return StreamingResponse(
+        events.stream(ids, last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/doctor/analytics/complaints")
+def doctor_complaint_analytics(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        group_by: str = "symptom",
+        granularity: str = "day",
+        current_user: User = Depends(require_role("doctor")),
+        db: Session = Depends(get_db)
+):
+    """Количество жалоб по дням/неделям в разрезе симптома, категории или тяжести"""
+    if group_by not in analytics.GROUP_BY_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"group_by: одно из {', '.join(analytics.GROUP_BY_OPTIONS)}")
+    if granularity not in analytics.GRANULARITY_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"granularity: одно из {', '.join(analytics.GRANULARITY_OPTIONS)}")
+
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=30)
+    return analytics.complaint_counts(db, date_from, date_to, group_by=group_by, granularity=granularity)
+
+
+@app.get("/doctor/analytics/rising-symptoms")
+def doctor_rising_symptoms(
+        days: int = 7,
+        limit: int = 10,
+        current_user: User = Depends(require_role("doctor")),
+        db: Session = Depends(get_db)
+):
+    """Симптомы с наибольшим ростом жалоб за последние days дней"""
+    if days < 1 or limit < 1:
+        raise HTTPException(status_code=400, detail="days и limit должны быть положительными")
+    return analytics.rising_symptoms(db, days=days, limit=limit)
+
+
+@app.post("/doctor/prescriptions", status_code=201)
 async def create_prescription(
+        body: Union[prescriptions.PrescriptionIn, prescriptions.PrescriptionList, prescriptions.ProtocolIn],
         current_user: User = Depends(require_role("doctor")),
         db: Session = Depends(get_db)
 ):
-    """Создать назначение (заглушка)"""
-    # TODO: реализовать создание назначений
-    return {"status": "ok", "message": "Назначение создано"}
+    """Создать назначения от имени текущего врача.
+
+    Тело — одно назначение ({patient_id, medication_name, ...}), список назначений
+    или протокол ({patient_ids, medications, start_date}): каждый препарат каждому пациенту.
+    Все назначения создаются одной транзакцией.
+    """
+    if not current_user.doctor_id:
+        raise HTTPException(status_code=404, detail="Профиль врача не найден")
+    ids, patient_ids = await prescriptions.create(db, current_user.doctor_id, body)
+    for patient_id in patient_ids:
+        audit.record(current_user, "doctor.prescription.create", patient_id)
+    return {"status": "ok", "created": len(ids), "ids": ids}
+
+
+# ========== ВЫГРУЗКА ==========
+
+@app.get("/export/{entity}")
+async def export_entity(
+        entity: str,
+        format: str = "ndjson",
+        gzip: bool = False,
+        since: Optional[datetime] = None,
+        current_user: User = Depends(require_role("doctor", "admin"))
+):
+    """Потоковая выгрузка patients/prescriptions/complaints (ndjson, csv, parquet).
+
+    since — водяной знак прошлой выгрузки: отдаются строки с updated_at после него.
+    Новый водяной знак возвращается в заголовке X-Export-Watermark.
+    """
+    if entity not in export.ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Неизвестный набор данных: {entity}")
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format: одно из {', '.join(export.FORMATS)}")
+    if format == "parquet" and export.pyarrow is None:
+        raise HTTPException(status_code=501, detail="Выгрузка в Parquet недоступна: не установлен pyarrow")
+
+    since = naive_utc(since)  # updated_at хранится в наивном UTC
+    audit.record(current_user, "export", detail=f"{entity} {format} since={since.isoformat() if since else '-'}")
+    until = await run_in_threadpool(export.watermark, entity, since)
+    headers = {
+        "Content-Disposition": f'attachment; filename="{export.filename(entity, format, gzip)}"',
+        "X-Export-Watermark": (until or since or datetime.min).isoformat()
+    }
+    if until is None:
+        return Response(status_code=204, headers=headers)
+
+    if format == "parquet":
+        path = await run_in_threadpool(export.parquet_tempfile, entity, since, until, gzip)
+        return FileResponse(path, media_type=export.MEDIA_TYPES[format], headers=headers,
+                            background=BackgroundTask(os.remove, path))
+
+    media_type = "application/gzip" if gzip else export.MEDIA_TYPES[format]
+    return StreamingResponse(export.iter_export(entity, format, since, until, gzip),
+                             media_type=media_type, headers=headers)
+
+
+# ========== АДМИНИСТРИРОВАНИЕ ==========
+
+@app.get("/admin/audit")
+async def admin_audit(
+        patient_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+        current_user: User = Depends(require_role("admin"))
+):
+    """Журнал доступа по пациенту и/или пользователю, новые записи первыми.
+
+    Записи попадают в журнал пачками, с задержкой до AUDIT_FLUSH_INTERVAL_MS.
+    """
+    if patient_id is None and user_id is None:
+        raise HTTPException(status_code=400, detail="Укажите patient_id или user_id")
+    if limit < 1 or limit > 10000:
+        raise HTTPException(status_code=400, detail="limit: от 1 до 10000")
+    # Журнал хранит время в наивном UTC
+    return await run_in_threadpool(audit.log.query, patient_id, user_id, naive_utc(since), naive_utc(until), limit)
+
+
+@app.get("/admin/profiles")
+def admin_profiles(current_user: User = Depends(require_role("admin"))):
+    """Список сохраненных профилей запросов"""
+    return profiling.list_profiles()
+
+
+@app.get("/admin/profiles/{profile_id}")
+def admin_profile(profile_id: str, current_user: User = Depends(require_role("admin"))):
+    """Профиль запроса: сводка и SQL-запросы с временем выполнения"""
+    path = profiling.profile_path(profile_id, '.json')
+    if not path:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return FileResponse(path, media_type="application/json")
+
+
+@app.get("/admin/profiles/{profile_id}/folded")
+def admin_profile_folded(profile_id: str, current_user: User = Depends(require_role("admin"))):
+    """Свернутые стеки профиля для flamegraph.pl / speedscope"""
+    path = profiling.profile_path(profile_id, '.folded')
+    if not path:
+        raise HTTPException(status_code=404, detail="Профиль не найден")
+    return FileResponse(path, media_type="text/plain; charset=utf-8")
 
 
 # ========== ЗАПУСК ==========
 
+def run_production(workers, host, port):
+    """Несколько воркеров: схема БД создается здесь один раз, воркеры ее не трогают"""
+    from database import engine
+
+    os.environ["SKIP_INIT_DB"] = "true"
+    # Метрики суммируются по воркерам через общую папку
+    os.environ["METRICS_MULTIPROCESS"] = "true"
+    metrics.MultiprocessCollector.clear(settings.METRICS_DIR)
+    engine.dispose()  # не передавать открытые соединения SQLite в воркеры
+    uvicorn.run("main:app", host=host, port=port, workers=workers, reload=False,
+                proxy_headers=True, log_level="info")
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=settings.APP_NAME)
+    parser.add_argument("--prod", action="store_true", help="production: несколько воркеров без reload")
+    parser.add_argument("--workers", type=int, default=settings.WORKERS)
+    parser.add_argument("--host", default=settings.HOST)
+    parser.add_argument("--port", type=int, default=settings.PORT)
+    args = parser.parse_args()
+
     print("=" * 60)
     print("🚀 MEDICAL API ЗАПУЩЕН")
-    print(f"📡 Порт: 5000")
-    print(f"🔄 Режим: {'DEBUG' if settings.APP_NAME == 'Medical API' else 'PRODUCTION'}")
-    print("=" * 60)
-    uvicorn.run("main:app", host="127.0.0.1", port=5000, reload=True)
\ No newline at end of file
+    print(f"📡 Порт: {args.port}")
+    if args.prod:
+        print(f"🔄 Режим: PRODUCTION, воркеров: {args.workers}")
+        print("=" * 60)
+        run_production(args.workers, args.host, args.port)
+    else:
+        print(f"🔄 Режим: {'DEBUG' if settings.APP_NAME == 'Medical API' else 'PRODUCTION'}")
+        print("=" * 60)
+        uvicorn.run("main:app", host=args.host, port=args.port, reload=True)
\ No newline at end of file
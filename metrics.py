@@ -0,0 +1,404 @@
+"""Метрики приложения в текстовом формате Prometheus.
+
+Собственный легковесный реестр без внешних зависимостей: счетчики, gauge и
+гистограммы с метками, хуки SQLAlchemy для времени запросов и пула соединений,
+ASGI-middleware для HTTP-маршрутов.
+
+При нескольких воркерах (METRICS_MULTIPROCESS) каждый процесс периодически
+сохраняет свои значения в METRICS_DIR, а /metrics отдает их сумму по всем
+воркерам, поэтому счетчики не "скачут" в зависимости от того, какой воркер
+ответил на запрос сборщика.
+"""
+import bisect
+import json
+import os
+import re
+import threading
+import time
+from functools import wraps
+
+from sqlalchemy import event
+
+# Бакеты по умолчанию (секунды): от долей миллисекунды до десятка секунд
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+        try:
+            return tuple(labels[name] for name in self.labelnames)
+        except KeyError:
+            raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def collect(self, items=None):
+        items = self.items() if items is None else items
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # метки -> [счетчики бакетов..., +Inf, сумма]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def items(self):
+        with self._lock:
+            return [(k, list(v)) for k, v in self._values.items()]
+
+    def collect(self, items=None):
+        items = self.items() if items is None else items
+        lines = []
+        for key, row in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), row[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def metrics(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def snapshot(self):
+        """Значения всех метрик: {имя: [(метки, значение), ...]}"""
+        return {metric.name: metric.items() for metric in self.metrics()}
+
+    def render(self, values=None):
+        """Все метрики в текстовом формате Prometheus (values — готовые значения, например сумма воркеров)"""
+        lines = []
+        for metric in self.metrics():
+            lines.extend(metric.header())
+            lines.extend(metric.collect(None if values is None else values.get(metric.name, [])))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# ========== МЕТРИКИ ==========
+
+http_requests_total = registry.counter(
+    'http_requests_total', 'Количество HTTP-запросов', ('method', 'route', 'status'))
+http_request_duration_seconds = registry.histogram(
+    'http_request_duration_seconds', 'Время обработки HTTP-запроса', ('method', 'route'))
+http_requests_in_progress = registry.gauge(
+    'http_requests_in_progress', 'HTTP-запросы в обработке', ('method',))
+
+db_statements_total = registry.counter(
+    'db_statements_total', 'Количество SQL-запросов', ('operation',))
+db_statement_duration_seconds = registry.histogram(
+    'db_statement_duration_seconds', 'Время выполнения SQL-запроса', ('operation',))
+db_statement_errors_total = registry.counter(
+    'db_statement_errors_total', 'SQL-запросы, завершившиеся ошибкой', ('operation',))
+
+db_pool_checkout_wait_seconds = registry.histogram(
+    'db_pool_checkout_wait_seconds', 'Ожидание соединения из пула')
+db_pool_connections_in_use = registry.gauge(
+    'db_pool_connections_in_use', 'Соединения, выданные из пула')
+
+auth_operation_duration_seconds = registry.histogram(
+    'auth_operation_duration_seconds', 'Время операций bcrypt/JWT', ('operation',),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+_SQL_OPERATION = re.compile(r'\s*(\w+)')
+
+
+def timed(histogram, **labels):
+    """Декоратор: записать время выполнения функции в гистограмму"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, **labels)
+        return wrapper
+    return decorator
+
+
+# ========== SQLALCHEMY ==========
+
+def _operation(statement):
+    match = _SQL_OPERATION.match(statement)
+    return match.group(1).upper() if match else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    operation = _operation(statement)
+    db_statements_total.inc(operation=operation)
+    db_statement_duration_seconds.observe(elapsed, operation=operation)
+
+
+def _handle_error(context):
+    started = context.connection.info.get('query_started') if context.connection else None
+    if started:
+        started.pop()
+    db_statement_errors_total.inc(operation=_operation(context.statement or ''))
+
+
+def instrument_engine(engine):
+    """Подключить сбор метрик SQL-запросов и пула соединений к движку"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+    pool = engine.pool
+    event.listen(pool, 'checkout', lambda *args: db_pool_connections_in_use.inc())
+    event.listen(pool, 'checkin', lambda *args: db_pool_connections_in_use.dec())
+
+    # У пула нет события "до выдачи соединения", поэтому ожидание меряем оберткой над connect()
+    pool_connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            db_pool_checkout_wait_seconds.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+# ========== НЕСКОЛЬКО ВОРКЕРОВ ==========
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessCollector:
+    """Сумма метрик всех воркеров через файлы {pid}.json в общей папке"""
+
+    def __init__(self, registry, directory, interval=1.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._write_lock = threading.Lock()  # поток синхронизации и запросы /metrics из пула потоков
+
+    @staticmethod
+    def clear(directory):
+        """Удалить файлы прошлых запусков (вызывается один раз до старта воркеров)"""
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                os.remove(os.path.join(directory, filename))
+
+    def write(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{os.getpid()}.json")
+        with self._write_lock:
+            with open(path + '.tmp', 'w') as f:
+                json.dump(self.registry.snapshot(), f)
+            os.replace(path + '.tmp', path)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='metrics-sync', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.write()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def render(self):
+        """Сумма по воркерам; gauge завершившихся воркеров не учитываются"""
+        self.write()
+        metrics = {metric.name: metric for metric in self.registry.metrics()}
+        merged = {}
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            pid = int(filename[:-5])
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, items in snapshot.items():
+                metric = metrics.get(name)
+                if metric is None or (metric.kind == 'gauge' and not alive):
+                    continue
+                values = merged.setdefault(name, {})
+                for key, value in items:
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        current = values.get(key)
+                        values[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        values[key] = values.get(key, 0) + value
+        return self.registry.render({name: list(values.items()) for name, values in merged.items()})
+
+
+collector = None
+
+
+def enable_multiprocess(directory, interval=1.0):
+    """Включить суммирование метрик по воркерам (в каждом воркере)"""
+    global collector
+    collector = MultiprocessCollector(registry, directory, interval)
+    return collector
+
+
+def render():
+    """Текст для /metrics: сумма по воркерам или метрики текущего процесса"""
+    return collector.render() if collector is not None else registry.render()
+
+
+# ========== HTTP ==========
+
+class MetricsMiddleware:
+    """ASGI-middleware: количество и время запросов по шаблону маршрута"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        http_requests_in_progress.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_progress.dec(method=method)
+            # Шаблон маршрута ("/doctor/patient/{patient_id}/card"), а не сырой путь, чтобы не плодить ряды
+            route = scope.get('route')
+            route_path = getattr(route, 'path', None) or 'unmatched'
+            http_requests_total.inc(method=method, route=route_path, status=str(status_code))
+            http_request_duration_seconds.observe(time.perf_counter() - started,
+                                                  method=method, route=route_path)
@@ -9,9 +9,14 @@ from .symptom import Symptom
 from .symptom_category import SymptomCategory
 from .specialization import Specialization
 from .department import Department
+from .complaint_stat import ComplaintDailyStat
+from .twin_state import PatientTwinState
+from .doctor_patient import DoctorPatient
+from .patient_event import PatientEvent
 
 __all__ = [
     'Base', 'User', 'Patient', 'Doctor', 'Diagnosis',
     'Prescription', 'Complaint', 'Symptom', 'SymptomCategory',
-    'Specialization', 'Department'
+    'Specialization', 'Department', 'ComplaintDailyStat', 'PatientTwinState',
+    'DoctorPatient', 'PatientEvent'
 ]
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 from datetime import datetime
 
 class Complaint(Base, BaseModel):
     __tablename__ = "complaints"
+    __table_args__ = (
+        Index('ix_complaints_patient_date', 'patient_id', 'complaint_date'),
+        Index('ix_complaints_updated_at', 'updated_at'),
+    )
 
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
     symptom_id = Column(Integer, ForeignKey('symptoms.id'), nullable=False)
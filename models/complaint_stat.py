@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
+from .base import Base
+
+class ComplaintDailyStat(Base):
+    """Сводка жалоб за день по симптому и тяжести (поддерживается инкрементально)"""
+    __tablename__ = "complaint_daily_stats"
+    __table_args__ = (
+        Index('ix_complaint_daily_stats_category_day', 'category_id', 'day'),
+    )
+
+    day = Column(Date, primary_key=True)
+    symptom_id = Column(Integer, ForeignKey('symptoms.id'), primary_key=True)
+    severity = Column(String(20), primary_key=True)
+    category_id = Column(Integer, ForeignKey('symptom_categories.id'), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
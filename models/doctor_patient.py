@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from .base import Base
+
+class DoctorPatient(Base):
+    """Панель врача: пациенты, которым он выписывал назначения (строится из prescriptions)"""
+    __tablename__ = "doctor_patients"
+    __table_args__ = (
+        # Список пациентов врача по давности контакта — один проход по диапазону индекса
+        Index('ix_doctor_patients_doctor_last_contact', 'doctor_id', 'last_contact'),
+    )
+
+    doctor_id = Column(Integer, ForeignKey('doctors.id'), primary_key=True)
+    patient_id = Column(Integer, ForeignKey('patients.id'), primary_key=True)
+    first_contact = Column(DateTime, nullable=False)
+    last_contact = Column(DateTime, nullable=False)
+    prescriptions_count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, Float, Integer, ForeignKey
+from sqlalchemy import Column, String, Date, Float, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 import enum
@@ -10,6 +10,9 @@ class GenderEnum(str, enum.Enum):
 
 class Patient(Base, BaseModel):
     __tablename__ = "patients"
+    __table_args__ = (
+        Index('ix_patients_updated_at', 'updated_at'),
+    )
 
     surname = Column(String(50), nullable=False)
     name = Column(String(50), nullable=False)
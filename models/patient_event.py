@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text
+from .base import Base
+
+class PatientEvent(Base):
+    """Журнал изменений по пациентам для рассылки подписчикам (SSE) из всех воркеров"""
+    __tablename__ = "patient_events"
+    # id не переиспользуются после удаления старых событий: по ним клиенты досылают пропущенное
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, nullable=False)
+    type = Column(String(20), nullable=False)
+    data = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
@@ -1,10 +1,20 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index, literal, text
 from sqlalchemy.orm import relationship
 from .base import Base, BaseModel
 from datetime import datetime
 
+STATUS_ACTIVE = 'активно'
+STATUS_COMPLETED = 'завершено'
+
 class Prescription(Base, BaseModel):
     __tablename__ = "prescriptions"
+    __table_args__ = (
+        # Частичный индекс: "текущие назначения" пациента читают только активные строки
+        Index('ix_prescriptions_active_patient', 'patient_id', 'end_date',
+              sqlite_where=text(f"status = '{STATUS_ACTIVE}'"),
+              postgresql_where=text(f"status = '{STATUS_ACTIVE}'")),
+        Index('ix_prescriptions_updated_at', 'updated_at'),
+    )
 
     patient_id = Column(Integer, ForeignKey('patients.id'), nullable=False)
     doctor_id = Column(Integer, ForeignKey('doctors.id'), nullable=False)
@@ -16,7 +26,12 @@ class Prescription(Base, BaseModel):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=True)
     instructions = Column(Text, nullable=True)
-    status = Column(String(20), default='активно')
+    status = Column(String(20), default=STATUS_ACTIVE)
 
     patient = relationship("Patient", back_populates="prescriptions")
-    doctor = relationship("Doctor", back_populates="prescriptions")
\ No newline at end of file
+    doctor = relationship("Doctor", back_populates="prescriptions")
+
+    @classmethod
+    def is_active(cls):
+        """Условие "активно" литералом, а не параметром: иначе SQLite не выберет частичный индекс"""
+        return cls.status == literal(STATUS_ACTIVE, literal_execute=True)
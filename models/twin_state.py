@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from .base import Base
+
+class PatientTwinState(Base):
+    """Снимок производных показателей пациента (цифровой двойник), пересчитывается пакетно"""
+    __tablename__ = "patient_twin_states"
+
+    patient_id = Column(Integer, ForeignKey('patients.id'), primary_key=True)
+    bmi = Column(Float, nullable=True)
+    age = Column(Integer, nullable=True)
+    age_band = Column(String(10), nullable=True)
+    active_medications = Column(Integer, nullable=False, default=0)
+    complaints_30d = Column(Integer, nullable=False, default=0)
+    complaints_90d = Column(Integer, nullable=False, default=0)
+    severity_30d = Column(Float, nullable=True)
+    severity_90d = Column(Float, nullable=True)
+    severity_trend = Column(Float, nullable=True)
+    computed_at = Column(DateTime, nullable=False)
@@ -0,0 +1,80 @@
+"""Панель врача: материализованная связь врач → пациент по назначениям.
+
+Таблица doctor_patients строится из prescriptions при импорте (rebuild_panel) и
+дополняется при создании назначений (record_prescriptions). Список пациентов
+врача читается одним проходом по индексу (doctor_id, last_contact), по ней же
+проверяется доступ врача к карте пациента и к подписке на события.
+"""
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import DoctorPatient, Prescription
+
+
+# ========== ПОСТРОЕНИЕ И ОБНОВЛЕНИЕ ==========
+
+def rebuild_panel(session):
+    """Пересобрать панель из всех назначений одним INSERT ... SELECT (без commit)"""
+    session.execute(delete(DoctorPatient))
+    query = (
+        select(Prescription.doctor_id, Prescription.patient_id,
+               func.min(Prescription.start_date), func.max(Prescription.start_date), func.count())
+        .group_by(Prescription.doctor_id, Prescription.patient_id)
+    )
+    result = session.execute(insert(DoctorPatient).from_select(
+        ['doctor_id', 'patient_id', 'first_contact', 'last_contact', 'prescriptions_count'], query))
+    return result.rowcount
+
+
+def record_prescriptions(session, prescriptions):
+    """Учесть новые назначения в панели (в текущей транзакции, без commit).
+
+    prescriptions — объекты Prescription или кортежи (doctor_id, patient_id, start_date).
+    """
+    rows = {}
+    for p in prescriptions:
+        if isinstance(p, Prescription):
+            p = (p.doctor_id, p.patient_id, p.start_date)
+        doctor_id, patient_id, start_date = p
+        row = rows.get((doctor_id, patient_id))
+        if row is None:
+            rows[(doctor_id, patient_id)] = {
+                "doctor_id": doctor_id, "patient_id": patient_id, "first_contact": start_date,
+                "last_contact": start_date, "prescriptions_count": 1
+            }
+        else:
+            row["first_contact"] = min(row["first_contact"], start_date)
+            row["last_contact"] = max(row["last_contact"], start_date)
+            row["prescriptions_count"] += 1
+    if not rows:
+        return 0
+
+    statement = sqlite_insert(DoctorPatient)
+    excluded = statement.excluded
+    statement = statement.on_conflict_do_update(
+        index_elements=['doctor_id', 'patient_id'],
+        set_={
+            # min/max с двумя аргументами в SQLite — скалярные функции
+            "first_contact": func.min(DoctorPatient.first_contact, excluded.first_contact),
+            "last_contact": func.max(DoctorPatient.last_contact, excluded.last_contact),
+            "prescriptions_count": DoctorPatient.prescriptions_count + excluded.prescriptions_count,
+        }
+    )
+    session.execute(statement, list(rows.values()))
+    return len(rows)
+
+
+# ========== ДОСТУП ==========
+
+def has_patient(session, doctor_id, patient_id):
+    """Есть ли пациент в панели врача (поиск по первичному ключу)"""
+    query = select(DoctorPatient.patient_id).where(
+        DoctorPatient.doctor_id == doctor_id, DoctorPatient.patient_id == patient_id)
+    return session.execute(query).first() is not None
+
+
+def accessible_patients(session, doctor_id, patient_ids):
+    """Подмножество patient_ids, входящих в панель врача"""
+    query = select(DoctorPatient.patient_id).where(
+        DoctorPatient.doctor_id == doctor_id, DoctorPatient.patient_id.in_(patient_ids))
+    return set(session.scalars(query))
@@ -0,0 +1,248 @@
+"""Профилирование отдельных запросов по требованию.
+
+Профилируются только запросы с заголовком X-Profile (или параметром _profile),
+равным settings.PROFILE_TOKEN, и доля settings.PROFILE_SAMPLE_RATE случайных запросов.
+Для такого запроса фоновый поток снимает через sys._current_frames() стеки потоков
+запроса и копит свернутые стеки (формат flamegraph.pl / speedscope) с именем потока
+в корне, а хуки SQLAlchemy записывают SQL-запросы с временем выполнения. Потоки
+запроса — поток event loop и потоки пула, где выполняются обработчики def и
+зависимости: они добавляются при открытии сессии БД (get_db) и при каждом SQL-запросе
+(track_thread), так как contextvar профиля копируется в пул потоков.
+Для остальных запросов накладные расходы — одна проверка contextvar.
+"""
+import contextvars
+import json
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+
+from config import settings
+
+PROFILE_HEADER = b'x-profile'
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_ID_RE = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$')
+
+_current = contextvars.ContextVar('profile_session', default=None)
+
+
+class StackSampler:
+    """Статистический профайлер: периодически снимает стеки отмеченных потоков"""
+
+    def __init__(self, interval):
+        self.threads = {}  # id потока -> имя
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def add_current_thread(self):
+        thread = threading.current_thread()
+        if thread.ident not in self.threads:
+            self.threads[thread.ident] = thread.name
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, name in list(self.threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                                 .replace(';', ','))
+                    frame = frame.f_back
+                stack.append(name.replace(';', ','))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self):
+        """Стеки в свернутом формате: "a;b;c <количество>" на строку"""
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + '\n'
+
+
+class ProfileSession:
+    def __init__(self, method, path, trigger):
+        now = datetime.now()
+        self.id = f"{now:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = now
+        self.sql = []
+        self.sampler = StackSampler(settings.PROFILE_INTERVAL_MS / 1000)
+        self.sampler.add_current_thread()  # поток event loop
+
+    def to_dict(self, duration, status_code):
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "status": status_code,
+            "samples": self.sampler.samples,
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+            "sql_count": len(self.sql),
+            "sql_total_ms": round(sum(q["duration_ms"] for q in self.sql), 3),
+            "sql": self.sql,
+        }
+
+
+def track_thread():
+    """Добавить текущий поток к профилю запроса, если запрос профилируется"""
+    session = _current.get()
+    if session is not None:
+        session.sampler.add_current_thread()
+    return session
+
+
+# ========== SQLALCHEMY ==========
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if track_thread() is not None:
+        conn.info['profile_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    session = _current.get()
+    if session is None:
+        return
+    started = conn.info.pop('profile_started', None)
+    if started is None:
+        return
+    session.sql.append({
+        "statement": statement,
+        "parameters": repr(parameters)[:500],
+        "executemany": executemany,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+    })
+
+
+def instrument_engine(engine):
+    """Подключить запись SQL-запросов профилируемого запроса к движку"""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+# ========== ХРАНЕНИЕ ==========
+
+def _save(session, summary):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(settings.PROFILE_DIR, session.id)
+    with open(base + '.folded', 'w', encoding='utf-8') as f:
+        f.write(session.sampler.folded())
+    with open(base + '.json', 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    _cleanup()
+
+
+def _cleanup():
+    """Оставить только последние settings.PROFILE_KEEP профилей"""
+    ids = sorted(name[:-5] for name in os.listdir(settings.PROFILE_DIR) if name.endswith('.json'))
+    for profile_id in ids[:-settings.PROFILE_KEEP]:
+        for ext in ('.json', '.folded'):
+            try:
+                os.remove(os.path.join(settings.PROFILE_DIR, profile_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles():
+    """Краткие сведения о сохраненных профилях, новые первыми"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    result = []
+    for name in sorted(os.listdir(settings.PROFILE_DIR), reverse=True):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(settings.PROFILE_DIR, name), encoding='utf-8') as f:
+            summary = json.load(f)
+        summary.pop('sql', None)
+        result.append(summary)
+    return result
+
+
+def profile_path(profile_id, ext):
+    """Путь к файлу профиля или None, если профиля нет"""
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, profile_id + ext)
+    return path if os.path.exists(path) else None
+
+
+# ========== MIDDLEWARE ==========
+
+def _trigger(scope):
+    """Причина профилирования запроса или None"""
+    token = settings.PROFILE_TOKEN
+    if token:
+        for name, value in scope['headers']:
+            if name == PROFILE_HEADER and secrets.compare_digest(value.decode('latin-1'), token):
+                return 'header'
+        query = scope.get('query_string', b'')
+        if query and PROFILE_QUERY_PARAM.encode() in query:
+            values = parse_qs(query.decode('latin-1')).get(PROFILE_QUERY_PARAM, [])
+            if any(secrets.compare_digest(value, token) for value in values):
+                return 'query'
+    if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+        return 'sample'
+    return None
+
+
+class ProfilingMiddleware:
+    """ASGI-middleware: профилирование запросов по заголовку, параметру или выборке"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        trigger = _trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        session = ProfileSession(scope['method'], scope['path'], trigger)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile-id', session.id.encode())]
+            await send(message)
+
+        token = _current.set(session)
+        started = time.perf_counter()
+        session.sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            session.sampler.stop()
+            _current.reset(token)
+            await run_in_threadpool(_save, session, session.to_dict(duration, status_code))
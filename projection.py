@@ -0,0 +1,74 @@
+"""Выбор полей ответа (параметр fields=): из БД читаются только запрошенные колонки."""
+import enum
+from datetime import date, datetime
+
+from fastapi import HTTPException
+
+from models import Patient, DoctorPatient
+
+PATIENT_COLUMNS = {
+    "id": Patient.id,
+    "surname": Patient.surname,
+    "name": Patient.name,
+    "patronim": Patient.patronim,
+    "birth_date": Patient.birth_date,
+    "gender": Patient.gender,
+    "height": Patient.height,
+    "weight": Patient.weight,
+    "email": Patient.email,
+    "phone": Patient.phone,
+    "city": Patient.city,
+    "street": Patient.street,
+    "building": Patient.building,
+}
+
+# Поля панели врача в списке его пациентов
+PANEL_COLUMNS = {
+    "first_contact": DoctorPatient.first_contact,
+    "last_contact": DoctorPatient.last_contact,
+    "prescriptions_count": DoctorPatient.prescriptions_count,
+}
+PANEL_FIELDS = tuple(PANEL_COLUMNS)
+
+PROFILE_DEFAULT = ("surname", "name", "patronim", "birth_date", "gender", "height", "weight",
+                   "email", "phone", "city", "street", "building", "twin")
+PATIENT_LIST_DEFAULT = ("id", "surname", "name", "patronim", "birth_date", "gender", "email", "phone")
+CARD_PATIENT_DEFAULT = ("surname", "name", "patronim", "birth_date", "gender", "email", "phone")
+CARD_SECTIONS = ("twin", "prescriptions", "complaints", "measurements")
+
+
+def parse_fields(fields, allowed, default):
+    """Список запрошенных полей в порядке запроса; без fields — поля по умолчанию"""
+    if not fields:
+        return list(default)
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    unknown = [f for f in requested if f not in allowed]
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Неизвестные поля: {', '.join(unknown) or '(пусто)'}; доступны: {', '.join(allowed)}"
+        )
+    return requested
+
+
+def patient_columns(fields):
+    """Колонки Patient для запрошенных полей (остальные поля — не колонки пациента)"""
+    return [PATIENT_COLUMNS[f].label(f) for f in fields if f in PATIENT_COLUMNS]
+
+
+def panel_columns(fields):
+    """Колонки панели врача для запрошенных полей"""
+    return [PANEL_COLUMNS[f].label(f) for f in fields if f in PANEL_COLUMNS]
+
+
+def to_json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def row_to_dict(row):
+    """Строка результата select(...) -> словарь {поле: значение для JSON}"""
+    return {key: to_json_value(value) for key, value in row._mapping.items()}
@@ -0,0 +1,168 @@
+"""Цифровой двойник пациента: производные показатели, рассчитанные пакетно.
+
+refresh_twin_states() находит пациентов, у которых изменились исходные строки
+(пациент, назначения, жалобы) после последнего расчета, и пересчитывает им
+показатели векторно (pandas/NumPy) пачками. Эндпоинты читают готовый снимок
+из patient_twin_states одним запросом по первичному ключу.
+"""
+from datetime import datetime, time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, union, or_, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from config import settings
+from models import Patient, Prescription, Complaint, PatientTwinState
+import writer
+
+SEVERITY_SCORES = {'Легкая': 1, 'Умеренная': 2, 'Тяжелая': 3}
+
+AGE_BANDS = [0, 18, 30, 45, 60, 75, 200]
+AGE_BAND_LABELS = ['0-17', '18-29', '30-44', '45-59', '60-74', '75+']
+
+TWIN_FIELDS = ('bmi', 'age', 'age_band', 'active_medications', 'complaints_30d', 'complaints_90d',
+               'severity_30d', 'severity_90d', 'severity_trend')
+
+
+# ========== ПОИСК УСТАРЕВШИХ СНИМКОВ ==========
+
+def stale_patient_ids(session, now):
+    """Пациенты без снимка, со снимком за прошлые дни или с изменениями после расчета.
+
+    Окна 30/90 дней сдвигаются каждый день, поэтому снимок за вчера устарел целиком;
+    изменения за сегодня ищутся по индексам updated_at, а не полным сканированием.
+    """
+    today = datetime.combine(now.date(), time.min)
+    twin = PatientTwinState
+
+    missing_or_old = (
+        select(Patient.id)
+        .outerjoin(twin, twin.patient_id == Patient.id)
+        .where(or_(twin.patient_id.is_(None), twin.computed_at < today))
+    )
+    changed = [
+        select(model_patient_id)
+        .join(twin, twin.patient_id == model_patient_id)
+        .where(model_updated_at >= today, model_updated_at > twin.computed_at)
+        for model_patient_id, model_updated_at in (
+            (Patient.id, Patient.updated_at),
+            (Prescription.patient_id, Prescription.updated_at),
+            (Complaint.patient_id, Complaint.updated_at),
+        )
+    ]
+    return [row[0] for row in session.execute(union(missing_or_old, *changed))]
+
+
+# ========== РАСЧЕТ ==========
+
+def _read(session, query):
+    return pd.read_sql(query, session.connection())
+
+
+def compute_batch(session, patient_ids, now):
+    """Показатели для пачки пациентов: DataFrame, индекс — patient_id"""
+    today = pd.Timestamp(now.date())
+    since_90 = today - pd.Timedelta(days=90)
+    since_30 = today - pd.Timedelta(days=30)
+
+    patients = _read(session, select(Patient.id.label('patient_id'), Patient.height, Patient.weight,
+                                     Patient.birth_date).where(Patient.id.in_(patient_ids)))
+    result = patients.set_index('patient_id')
+
+    # ИМТ: вес (кг) / рост (м)^2, только для правдоподобных значений
+    height_m = result['height'].astype(float) / 100
+    weight = result['weight'].astype(float)
+    valid = (height_m > 0.5) & (height_m < 2.6) & (weight > 1)
+    result['bmi'] = np.where(valid, (weight / height_m ** 2).round(1), np.nan)
+
+    # Возраст в полных годах и возрастная группа
+    birth = pd.to_datetime(result['birth_date'], errors='coerce')
+    before_birthday = (birth.dt.month > today.month) | ((birth.dt.month == today.month) & (birth.dt.day > today.day))
+    age = today.year - birth.dt.year - before_birthday.astype(int)
+    result['age'] = age.where(age >= 0)
+    result['age_band'] = pd.cut(result['age'], AGE_BANDS, right=False, labels=AGE_BAND_LABELS)
+
+    # Активные назначения (частичный индекс по активным строкам)
+    active = _read(session, select(Prescription.patient_id, func.count().label('n'))
+                   .where(Prescription.patient_id.in_(patient_ids), Prescription.is_active(),
+                          or_(Prescription.end_date.is_(None), Prescription.end_date >= today.to_pydatetime()))
+                   .group_by(Prescription.patient_id))
+    result['active_medications'] = active.set_index('patient_id')['n'].reindex(result.index, fill_value=0)
+
+    # Жалобы за 90 дней: частота и тяжесть за 30 дней, 90 дней и тренд (30 дней против 31–90)
+    complaints = _read(session, select(Complaint.patient_id, Complaint.complaint_date, Complaint.severity)
+                       .where(Complaint.patient_id.in_(patient_ids),
+                              Complaint.complaint_date >= since_90.to_pydatetime()))
+    complaint_date = pd.to_datetime(complaints['complaint_date'])
+    complaints['score'] = complaints['severity'].map(SEVERITY_SCORES).astype(float)
+    recent = (complaint_date >= since_30).to_numpy()
+
+    by_patient = complaints.groupby('patient_id')
+    recent_by_patient = complaints[recent].groupby('patient_id')
+    older_by_patient = complaints[~recent].groupby('patient_id')
+
+    result['complaints_90d'] = by_patient.size().reindex(result.index, fill_value=0)
+    result['complaints_30d'] = recent_by_patient.size().reindex(result.index, fill_value=0)
+    result['severity_90d'] = by_patient['score'].mean().reindex(result.index).round(2)
+    result['severity_30d'] = recent_by_patient['score'].mean().reindex(result.index).round(2)
+    severity_older = older_by_patient['score'].mean().reindex(result.index)
+    result['severity_trend'] = (result['severity_30d'] - severity_older).round(2)
+
+    return result[list(TWIN_FIELDS)]
+
+
+def _to_rows(frame, now):
+    frame = frame.astype(object).where(frame.notna(), None)
+    rows = []
+    for patient_id, values in zip(frame.index, frame.itertuples(index=False, name=None)):
+        row = dict(zip(TWIN_FIELDS, values))
+        row['patient_id'] = int(patient_id)
+        row['age'] = int(row['age']) if row['age'] is not None else None
+        row['age_band'] = str(row['age_band']) if row['age_band'] is not None else None
+        row['active_medications'] = int(row['active_medications'])
+        row['complaints_30d'] = int(row['complaints_30d'])
+        row['complaints_90d'] = int(row['complaints_90d'])
+        row['computed_at'] = now
+        rows.append(row)
+    return rows
+
+
+def _upsert(session, rows):
+    statement = sqlite_insert(PatientTwinState)
+    statement = statement.on_conflict_do_update(
+        index_elements=['patient_id'],
+        set_={name: statement.excluded[name] for name in TWIN_FIELDS + ('computed_at',)}
+    )
+    session.execute(statement, rows)
+
+
+def refresh_twin_states(session, now=None, batch_size=None, full=False):
+    """Пересчитать снимки устаревших (или всех при full=True) пациентов; вернуть их число"""
+    now = now or datetime.utcnow()
+    batch_size = batch_size or settings.TWIN_BATCH_SIZE
+
+    if full:
+        patient_ids = list(session.scalars(select(Patient.id)))
+    else:
+        patient_ids = stale_patient_ids(session, now)
+
+    for start in range(0, len(patient_ids), batch_size):
+        batch = patient_ids[start:start + batch_size]
+        rows = _to_rows(compute_batch(session, batch, now), now)
+        session.commit()  # завершить читающую транзакцию, запись идет через писателя
+        if rows:
+            writer.execute(_upsert, rows)
+    return len(patient_ids)
+
+
+# ========== ЧТЕНИЕ ==========
+
+def get_twin_state(session, patient_id):
+    """Готовый снимок показателей пациента или None, если он еще не рассчитан"""
+    state = session.get(PatientTwinState, patient_id)
+    if state is None:
+        return None
+    result = {name: getattr(state, name) for name in TWIN_FIELDS}
+    result['computed_at'] = state.computed_at.isoformat()
+    return result
@@ -1,45 +1,50 @@
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 import pandas as pd
 from datetime import datetime
-from database import get_db
+from database import SessionLocal
 from config import settings
 from fastapi import HTTPException, status, Depends
 from models import User
+from metrics import timed, auth_operation_duration_seconds
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+@timed(auth_operation_duration_seconds, operation='bcrypt_verify')
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+@timed(auth_operation_duration_seconds, operation='bcrypt_hash')
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+@timed(auth_operation_duration_seconds, operation='jwt_encode')
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+@timed(auth_operation_duration_seconds, operation='jwt_encode')
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
+@timed(auth_operation_duration_seconds, operation='jwt_decode')
 def verify_token(token: str) -> dict:
     try:
         return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(status_code=401, detail="Could not validate credentials")
     try:
         payload = verify_token(token)
@@ -49,7 +54,10 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.email == email).first()
+    # Своя короткая сессия, а не get_db: соединение возвращается в пул сразу после проверки,
+    # а не держится до конца ответа (для SSE и выгрузок — все время потока)
+    with SessionLocal() as session:
+        user = session.query(User).filter(User.email == email).first()
     if user is None:
         raise credentials_exception
     return user
@@ -60,6 +68,12 @@ def safe_str(value):
         return None
     return str(value).strip()
 
+def naive_utc(value):
+    """datetime с часовым поясом -> наивное UTC, как хранится в БД (SQLite отбрасывает смещение молча)"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
 def parse_date(date_str):
     """Парсинг даты из разных форматов"""
     if not date_str or pd.isna(date_str):
@@ -72,13 +86,13 @@ def parse_date(date_str):
             continue
     return None
 
-def require_role(required_role: str):
-    """Dependency для проверки роли пользователя"""
+def require_role(*roles: str):
+    """Dependency для проверки роли пользователя (подходит любая из перечисленных)"""
     def role_checker(current_user: User = Depends(get_current_user)):
-        if current_user.role != required_role:
+        if current_user.role not in roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Требуется роль: {required_role}"
+                detail=f"Требуется роль: {', '.join(roles)}"
             )
         return current_user
     return role_checker
\ No newline at end of file
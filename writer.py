@@ -0,0 +1,191 @@
+"""Единственный писатель в SQLite.
+
+SQLite допускает одну пишущую транзакцию на файл, поэтому при нескольких
+воркерах параллельные записи получают "database is locked". Все записи
+приложения идут через WriteCoordinator: в каждом процессе один поток-писатель
+собирает задания в пачку и выполняет ее одной транзакцией под межпроцессной
+файловой блокировкой. Чтение остается параллельным (WAL).
+
+Задание записи — функция fn(session, *args), которая меняет данные, но не
+делает commit; результат функции (простые значения, не ORM-объекты сессии)
+возвращается вызывающему после commit.
+"""
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from config import settings
+from database import SessionLocal
+from metrics import registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессной блокировки нет, запускайте один воркер
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+write_batch_size = registry.histogram(
+    'db_write_batch_size', 'Заданий записи в одной транзакции',
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500))
+write_lock_wait_seconds = registry.histogram(
+    'db_write_lock_wait_seconds', 'Ожидание межпроцессной блокировки записи')
+write_queue_depth = registry.gauge(
+    'db_write_queue_depth', 'Заданий в очереди писателя')
+
+_STOP = object()
+
+
+@contextmanager
+def write_lock():
+    """Межпроцессная блокировка записи (flock на settings.WRITE_LOCK_PATH)"""
+    if fcntl is None:
+        yield
+        return
+    with open(settings.WRITE_LOCK_PATH, 'a') as f:
+        started = time.perf_counter()
+        fcntl.flock(f, fcntl.LOCK_EX)
+        write_lock_wait_seconds.observe(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def try_lock(path):
+    """Взять эксклюзивную блокировку файла без ожидания.
+
+    Возвращает открытый файл (блокировка держится, пока он открыт) или None,
+    если блокировку держит другой процесс.
+    """
+    f = open(path, 'a')
+    if fcntl is None:
+        return f
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+class _Job:
+    __slots__ = ('fn', 'args', 'future')
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+
+
+class WriteCoordinator:
+    def __init__(self, session_factory, max_batch=None, max_delay=None):
+        self.session_factory = session_factory
+        self.max_batch = max_batch or settings.WRITE_BATCH_SIZE
+        self.max_delay = max_delay if max_delay is not None else settings.WRITE_BATCH_DELAY_MS / 1000
+        self._queue = queue.Queue()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._loop, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Дописать очередь и остановить поток-писатель"""
+        if not self.running:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, fn, *args):
+        """Поставить задание в очередь, вернуть concurrent.futures.Future с результатом"""
+        job = _Job(fn, args)
+        if not self.running:
+            job.future.set_exception(RuntimeError("Писатель БД не запущен"))
+            return job.future
+        self._queue.put(job)
+        write_queue_depth.set(self._queue.qsize())
+        return job.future
+
+    # ========== ПОТОК-ПИСАТЕЛЬ ==========
+
+    def _collect(self, first):
+        """Добрать в пачку задания, пришедшие в течение max_delay"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(job)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch = self._collect(first)
+            write_queue_depth.set(self._queue.qsize())
+            write_batch_size.observe(len(batch))
+            self._execute(batch)
+
+    def _execute(self, batch):
+        try:
+            with write_lock(), self.session_factory() as session:
+                results = [job.fn(session, *job.args) for job in batch]
+                session.commit()
+        except Exception as e:
+            error = e
+        else:
+            for job, result in zip(batch, results):
+                job.future.set_result(result)
+            return
+
+        if len(batch) == 1:
+            logger.error("Ошибка записи в БД", exc_info=error)
+            batch[0].future.set_exception(error)
+            return
+        # Одно ошибочное задание не должно откатывать чужие: повторяем по одному
+        for job in batch:
+            self._execute([job])
+
+
+coordinator = WriteCoordinator(SessionLocal)
+
+
+def execute(fn, *args):
+    """Выполнить задание записи и дождаться результата (из синхронного кода).
+
+    Без запущенного писателя (CLI, импорт) задание выполняется сразу в
+    отдельной сессии под той же межпроцессной блокировкой.
+    """
+    if coordinator.running:
+        return coordinator.submit(fn, *args).result()
+    with write_lock(), SessionLocal() as session:
+        result = fn(session, *args)
+        session.commit()
+        return result
+
+
+async def run(fn, *args):
+    """Выполнить задание записи из асинхронного обработчика"""
+    if coordinator.running:
+        return await asyncio.wrap_future(coordinator.submit(fn, *args))
+    return await asyncio.get_running_loop().run_in_executor(None, execute, fn, *args)